@@ -13,12 +13,45 @@ class Settings(BaseSettings):
     # Vector database configuration
     vector_db_path: str = os.getenv("VECTOR_DB_PATH", "./vector_store")
     vector_db_type: str = os.getenv("VECTOR_DB_TYPE", "chromadb")
+    vector_db_batch_size: int = int(os.getenv("VECTOR_DB_BATCH_SIZE", "1000"))
+
+    # Vector index server configuration ("local" opens the index in-process,
+    # "client" talks to `python manage.py serve-vectors` over a Unix socket)
+    vector_store_mode: str = os.getenv("VECTOR_STORE_MODE", "local")
+    vector_socket_path: str = os.getenv("VECTOR_SOCKET_PATH", "./vector_index.sock")
+    vector_server_batch_window_ms: float = float(
+        os.getenv("VECTOR_SERVER_BATCH_WINDOW_MS", "2")
+    )
+    vector_server_max_batch: int = int(os.getenv("VECTOR_SERVER_MAX_BATCH", "64"))
+    vector_server_read_workers: int = int(os.getenv("VECTOR_SERVER_READ_WORKERS", "4"))
+    # Longest a client waits for a reply; must cover compacting the index
+    vector_client_timeout_s: float = float(
+        os.getenv("VECTOR_CLIENT_TIMEOUT_S", "300")
+    )
+
+    # Index compaction: rebuild once this share of chunks has been deleted
+    compaction_threshold: float = float(os.getenv("COMPACTION_THRESHOLD", "0.2"))
+    compaction_min_deletions: int = int(os.getenv("COMPACTION_MIN_DELETIONS", "500"))
+
+    # Index snapshot configuration
+    snapshot_path: str = os.getenv("SNAPSHOT_PATH", "./snapshots")
 
     # PDF upload path
     pdf_upload_path: str = os.getenv("PDF_UPLOAD_PATH", "../data")
 
+    # Extracted page cache configuration
+    page_cache_enabled: bool = os.getenv("PAGE_CACHE_ENABLED", "True").lower() == "true"
+    page_cache_path: str = os.getenv("PAGE_CACHE_PATH", "./page_cache")
+    extract_tables: bool = os.getenv("EXTRACT_TABLES", "False").lower() == "true"
+
     # Embedding model configuration
     embedding_model: str = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+    embedding_batch_size: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+    embedding_max_workers: int = int(os.getenv("EMBEDDING_MAX_WORKERS", "4"))
+
+    # Indexing configuration (0 uses one worker process per CPU)
+    index_workers: int = int(os.getenv("INDEX_WORKERS", "0"))
+    ingest_state_path: str = os.getenv("INGEST_STATE_PATH", "./ingest_state.json")
 
     # LLM configuration
     llm_model: str = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
@@ -29,9 +62,50 @@ class Settings(BaseSettings):
     chunk_size: int = int(os.getenv("CHUNK_SIZE", "1000"))
     chunk_overlap: int = int(os.getenv("CHUNK_OVERLAP", "200"))
 
+    # Summary configuration
+    summaries_enabled: bool = os.getenv("SUMMARIES_ENABLED", "False").lower() == "true"
+    summary_model: str = os.getenv("SUMMARY_MODEL", "")
+    summary_min_section_chars: int = int(os.getenv("SUMMARY_MIN_SECTION_CHARS", "500"))
+    summary_section_max_chars: int = int(os.getenv("SUMMARY_SECTION_MAX_CHARS", "12000"))
+    summary_max_concurrency: int = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4"))
+
+    # Conversation cache and write-behind configuration
+    conversation_cache_size: int = int(os.getenv("CONVERSATION_CACHE_SIZE", "1000"))
+    conversation_cache_ttl_seconds: float = float(
+        os.getenv("CONVERSATION_CACHE_TTL_SECONDS", "1800")
+    )
+    message_write_batch_size: int = int(os.getenv("MESSAGE_WRITE_BATCH_SIZE", "100"))
+    message_flush_interval_ms: float = float(
+        os.getenv("MESSAGE_FLUSH_INTERVAL_MS", "50")
+    )
+    message_dead_letter_path: str = os.getenv(
+        "MESSAGE_DEAD_LETTER_PATH", "./message_dead_letter.jsonl"
+    )
+    # Check cached conversations against the database on every turn, for
+    # deployments where several workers serve the same conversations
+    # (on by default with VECTOR_STORE_MODE=client)
+    conversation_cache_check_db: bool = os.getenv(
+        "CONVERSATION_CACHE_CHECK_DB",
+        str(os.getenv("VECTOR_STORE_MODE", "local") == "client"),
+    ).lower() == "true"
+
     # Retrieval configuration
     retrieval_k: int = int(os.getenv("RETRIEVAL_K", "5"))
     similarity_threshold: float = float(os.getenv("SIMILARITY_THRESHOLD", "0.7"))
+    # "similarity" returns the top RETRIEVAL_K chunks, "mmr" a diverse subset
+    # of MMR_FETCH_K candidates sized between RETRIEVAL_MIN_K and RETRIEVAL_MAX_K
+    retrieval_mode: str = os.getenv("RETRIEVAL_MODE", "similarity")
+    mmr_fetch_k: int = int(os.getenv("MMR_FETCH_K", "50"))
+    mmr_lambda: float = float(os.getenv("MMR_LAMBDA", "0.5"))
+    retrieval_min_k: int = int(os.getenv("RETRIEVAL_MIN_K", "2"))
+    retrieval_max_k: int = int(os.getenv("RETRIEVAL_MAX_K", "8"))
+    retrieval_min_gap: float = float(os.getenv("RETRIEVAL_MIN_GAP", "0.05"))
+    query_rewrite_enabled: bool = (
+        os.getenv("QUERY_REWRITE_ENABLED", "False").lower() == "true"
+    )
+    query_rewrite_timeout_ms: float = float(
+        os.getenv("QUERY_REWRITE_TIMEOUT_MS", "1500")
+    )
 
     # Server configuration
     host: str = os.getenv("HOST", "0.0.0.0")
@@ -50,11 +124,23 @@ class Settings(BaseSettings):
     # Logging configuration
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
 
+    # Profiling configuration: when enabled, requests sent with "X-Profile: 1"
+    # or armed through /api/profiles/arm are profiled
+    profiling_enabled: bool = os.getenv("PROFILING_ENABLED", "False").lower() == "true"
+    profile_dir: str = os.getenv("PROFILE_DIR", "./profiles")
+    profile_max_entries: int = int(os.getenv("PROFILE_MAX_ENTRIES", "20"))
+    profile_interval_ms: float = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    profile_max_duration_s: float = float(os.getenv("PROFILE_MAX_DURATION_S", "120"))
+    profile_max_depth: int = int(os.getenv("PROFILE_MAX_DEPTH", "128"))
+    profile_traceback_frames: int = int(os.getenv("PROFILE_TRACEBACK_FRAMES", "1"))
+    profile_top_allocations: int = int(os.getenv("PROFILE_TOP_ALLOCATIONS", "30"))
+
+    # Startup configuration
+    warmup_on_startup: bool = os.getenv("WARMUP_ON_STARTUP", "True").lower() == "true"
+
     class Config:
         env_file = ".env"
         case_sensitive = True
 
 
 settings = Settings()
-
-print(settings)
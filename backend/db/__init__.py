@@ -2,6 +2,7 @@ import os
 
 from sqlalchemy import create_engine
 
+from db.fts import setup_fts
 from db.models import Base
 from db.models.message import Message
 from db.models.conversation import Conversation
@@ -23,6 +24,7 @@ class DB:
                 Base.metadata.drop_all(conn)
 
             Base.metadata.create_all(conn)
+            setup_fts(conn, is_drop_table=is_drop_table)
 
     @property
     def engine(self):
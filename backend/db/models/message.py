@@ -1,8 +1,50 @@
-from sqlalchemy import Text, ForeignKey
+import html
+import re
+
+from sqlalchemy import Text, ForeignKey, func, text
 from sqlalchemy.orm import Mapped, relationship, mapped_column
 
 from db.models import BaseModel, VARCHAR
 
+SEARCH_TERM = re.compile(r"\w+", re.UNICODE)
+
+# Control characters stand in for the highlight tags until the snippet is
+# escaped, so only the tags added here reach clients as HTML
+MATCH_START, MATCH_END = "\x02", "\x03"
+
+SEARCH_QUERY = text(
+    """
+    SELECT m.id AS message_id,
+           m.conversation_token,
+           c.name AS conversation_name,
+           m.role,
+           snippet(messages_fts, 0, :match_start, :match_end, '…', :snippet_tokens)
+               AS snippet,
+           -messages_fts.rank AS score,
+           m.created_at
+    FROM messages_fts
+    JOIN messages m ON m.id = messages_fts.rowid
+    JOIN conversations c ON c.token = m.conversation_token
+    WHERE messages_fts MATCH :query
+    ORDER BY messages_fts.rank
+    LIMIT :limit OFFSET :offset
+    """
+)
+
+
+def highlight_snippet(snippet: str) -> str:
+    """HTML-escape a snippet and wrap its matches in <mark> tags"""
+    return (
+        html.escape(snippet)
+        .replace(MATCH_START, "<mark>")
+        .replace(MATCH_END, "</mark>")
+    )
+
+
+def build_match_query(query: str) -> str:
+    """Turn free text into an FTS5 query matching all terms, ignoring FTS syntax"""
+    return " ".join(f'"{term}"' for term in SEARCH_TERM.findall(query))
+
 
 class Message(BaseModel):
     __tablename__ = "messages"
@@ -14,3 +56,34 @@ class Message(BaseModel):
 
     role: Mapped[VARCHAR]
     content: Mapped[Text] = mapped_column(Text, nullable=False)
+
+    @classmethod
+    def count(cls, session, conversation_token: str) -> int:
+        """Number of stored messages of a conversation"""
+        return (
+            session.query(func.count(cls.id))
+            .filter(cls.conversation_token == conversation_token)
+            .scalar()
+        )
+
+    @classmethod
+    def search(cls, session, query: str, limit: int, offset: int = 0, snippet_tokens=16):
+        """Full-text search over message contents, best matches first"""
+        match_query = build_match_query(query)
+        if not match_query:
+            return []
+
+        rows = session.execute(
+            SEARCH_QUERY,
+            {
+                "query": match_query,
+                "limit": limit,
+                "offset": offset,
+                "match_start": MATCH_START,
+                "match_end": MATCH_END,
+                "snippet_tokens": snippet_tokens,
+            },
+        ).mappings().all()
+        return [
+            {**row, "snippet": highlight_snippet(row["snippet"])} for row in rows
+        ]
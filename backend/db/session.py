@@ -3,9 +3,9 @@ from contextlib import contextmanager
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, scoped_session
 
-from db import DB
+from db import database
 
-engine = DB().engine
+engine = database.engine
 
 SessionFactory = sessionmaker(bind=engine)
 
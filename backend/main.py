@@ -1,11 +1,16 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from db import database
 
 from routes import api_router
 
 from config import settings
+from services.container import services
 import logging
 import os
 
@@ -13,10 +18,40 @@ import os
 logging.basicConfig(level=settings.log_level)
 logger = logging.getLogger(__name__)
 
+
+def _warm_up_services():
+    try:
+        services.warm_up()
+    except Exception as e:
+        logger.error(f"Error warming up services: {str(e)}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize services on startup"""
+    logger.info("Starting RAG Q&A System...")
+    os.makedirs(settings.pdf_upload_path, exist_ok=True)
+    database.setup_db(is_drop_table=False)
+
+    # Build the heavy services in the background so the server accepts
+    # connections immediately; /ready reports when they are available.
+    warmup_task = None
+    if settings.warmup_on_startup:
+        warmup_task = asyncio.create_task(asyncio.to_thread(_warm_up_services))
+
+    yield
+
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+
+    await asyncio.to_thread(services.shutdown)
+
+
 app = FastAPI(
     title="RAG-based Financial Statement Q&A System",
     description="AI-powered Q&A system for financial documents using RAG",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -30,20 +65,24 @@ app.add_middleware(
 app.include_router(api_router)
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize services on startup"""
-    logger.info("Starting RAG Q&A System...")
-    os.makedirs(settings.pdf_upload_path, exist_ok=True)
-    database.setup_db(is_drop_table=False)
-
-
 @app.get("/")
 async def root():
     """Health check endpoint"""
     return {"message": "RAG-based Financial Statement Q&A System is running"}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness endpoint, returns 503 until services are initialized.
+
+    Without warm-up the services are built by the first request that needs
+    them, so the app is ready as soon as it accepts connections.
+    """
+    is_ready = services.ready or not settings.warmup_on_startup
+    content = {"ready": is_ready, "init_times": services.init_times}
+    return JSONResponse(content=content, status_code=200 if is_ready else 503)
+
+
 if __name__ == "__main__":
     import uvicorn
 
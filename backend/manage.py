@@ -0,0 +1,200 @@
+"""Command-line entry point for maintenance tasks.
+
+Usage (from the backend directory):
+    python manage.py snapshot export [--incremental]
+    python manage.py snapshot import <snapshot_id or path> [--force]
+    python manage.py snapshot list
+    python manage.py summarize [filename ...]
+    python manage.py reindex [--cache-only] [--no-progress]
+    python manage.py serve-vectors
+    python manage.py compact [--force]
+    python manage.py ingest <dir | glob | zip> ... [--force] [--no-progress]
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot_command(args):
+    from services.container import services
+    from services.snapshot import SNAPSHOT_SUFFIX
+
+    snapshot_manager = services.snapshot_manager
+
+    if args.action == "export":
+        result = snapshot_manager.export(incremental=args.incremental)
+    elif args.action == "import":
+        snapshot_id = args.snapshot
+        if os.path.isfile(snapshot_id):
+            # Snapshots copied from another host are imported from the snapshot dir
+            filename = os.path.basename(snapshot_id)
+            destination = os.path.join(snapshot_manager.snapshot_path, filename)
+            if os.path.abspath(snapshot_id) != os.path.abspath(destination):
+                shutil.copyfile(snapshot_id, destination)
+            snapshot_id = filename.removesuffix(SNAPSHOT_SUFFIX)
+        result = snapshot_manager.import_snapshot(snapshot_id, force=args.force)
+    else:
+        result = snapshot_manager.list_snapshots()
+
+    print(json.dumps(result, indent=2))
+
+
+def summarize_command(args):
+    from services.container import services
+
+    filenames = args.filenames or sorted(
+        filename
+        for filename in os.listdir(settings.pdf_upload_path)
+        if filename.lower().endswith(".pdf")
+    )
+
+    for filename in filenames:
+        file_path = os.path.join(settings.pdf_upload_path, os.path.basename(filename))
+        pages_content = services.pdf_processor.extract_text_from_pdf(file_path)
+        count = services.document_summarizer.summarize(
+            os.path.basename(file_path), pages_content
+        )
+        print(f"{filename}: {count} summary nodes")
+
+
+def reindex_command(args):
+    from services.container import services
+    from services.indexing import Reindexer
+
+    report = Reindexer(services.vector_store).run(
+        cache_only=args.cache_only, progress=not args.no_progress
+    )
+    print(json.dumps(report, indent=2))
+
+
+def serve_vectors_command(args):
+    import asyncio
+
+    from services.vector_server import VectorIndexServer
+    from services.vector_store import VectorStore
+
+    server = VectorIndexServer(VectorStore(), socket_path=args.socket_path)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+def compact_command(args):
+    from services.container import services
+
+    vector_store = services.vector_store
+    compacted = vector_store.compact() if args.force else vector_store.maybe_compact()
+    print(json.dumps({"compacted": compacted}))
+
+
+def ingest_command(args):
+    from services.container import services
+    from services.indexing import BulkIngestor
+
+    report = BulkIngestor(services.vector_store).run(
+        args.inputs, force=args.force, progress=not args.no_progress
+    )
+    print(json.dumps(report, indent=2))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Finance chat bot maintenance tasks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    snapshot_parser = subparsers.add_parser("snapshot", help="Index snapshots")
+    snapshot_actions = snapshot_parser.add_subparsers(dest="action", required=True)
+
+    export_parser = snapshot_actions.add_parser("export", help="Export a snapshot")
+    export_parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only export changes since the most recent snapshot",
+    )
+
+    import_parser = snapshot_actions.add_parser("import", help="Import a snapshot")
+    import_parser.add_argument("snapshot", help="Snapshot id or path to a snapshot file")
+    import_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Skip embedding model and delta base checks",
+    )
+
+    snapshot_actions.add_parser("list", help="List snapshots")
+    snapshot_parser.set_defaults(func=snapshot_command)
+
+    summarize_parser = subparsers.add_parser(
+        "summarize", help="Precompute section and document summaries"
+    )
+    summarize_parser.add_argument(
+        "filenames",
+        nargs="*",
+        help="PDFs in the upload directory (default: all of them)",
+    )
+    summarize_parser.set_defaults(func=summarize_command)
+
+    reindex_parser = subparsers.add_parser(
+        "reindex",
+        help="Re-chunk and re-embed all uploaded PDFs from the page cache",
+    )
+    reindex_parser.add_argument(
+        "--cache-only",
+        action="store_true",
+        help="Fail instead of running pdfplumber for files missing from the cache",
+    )
+    reindex_parser.add_argument(
+        "--no-progress", action="store_true", help="Hide the progress bar"
+    )
+    reindex_parser.set_defaults(func=reindex_command)
+
+    serve_vectors_parser = subparsers.add_parser(
+        "serve-vectors",
+        help="Own the vector index and serve it to workers over a Unix socket",
+    )
+    serve_vectors_parser.add_argument(
+        "--socket-path", default=settings.vector_socket_path
+    )
+    serve_vectors_parser.set_defaults(func=serve_vectors_command)
+
+    compact_parser = subparsers.add_parser(
+        "compact", help="Rebuild the vector index to reclaim deleted space"
+    )
+    compact_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Compact even if the deletion threshold has not been reached",
+    )
+    compact_parser.set_defaults(func=compact_command)
+
+    ingest_parser = subparsers.add_parser(
+        "ingest", help="Bulk-ingest PDFs from directories, globs or ZIP archives"
+    )
+    ingest_parser.add_argument("inputs", nargs="+", help="Directory, glob or ZIP file")
+    ingest_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-ingest files already recorded as completed",
+    )
+    ingest_parser.add_argument(
+        "--no-progress", action="store_true", help="Hide the progress bar"
+    )
+    ingest_parser.set_defaults(func=ingest_command)
+
+    return parser
+
+
+def main():
+    logging.basicConfig(level=settings.log_level)
+    args = build_parser().parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
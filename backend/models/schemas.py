@@ -21,6 +21,8 @@ class ChatResponse(BaseModel):
     processing_time: float
     conversation_token: str
     created_at: datetime
+    timings: Optional[Dict[str, Dict[str, Any]]] = None
+    critical_path: Optional[List[str]] = None
 
 
 class DocumentInfo(BaseModel):
@@ -53,6 +55,61 @@ class ChunksResponse(BaseModel):
     total_count: int
 
 
+class SnapshotDocument(BaseModel):
+    filename: str
+    chunks_count: int
+
+
+class SnapshotInfo(BaseModel):
+    snapshot_id: str
+    kind: str
+    base_snapshot_id: Optional[str] = None
+    created_at: datetime
+    embedding_model: str
+    count: int
+    deleted_count: int
+    size_bytes: int
+    filename: str
+    registry: List[SnapshotDocument]
+
+
+class SnapshotsResponse(BaseModel):
+    snapshots: List[SnapshotInfo]
+
+
+class ProfileStage(BaseModel):
+    name: str
+    thread: str
+    start_ms: float
+    duration_ms: float
+
+
+class ProfileAllocation(BaseModel):
+    location: str
+    size_bytes: int
+    count: int
+
+
+class ProfileInfo(BaseModel):
+    id: str
+    path: str
+    started_at: datetime
+    duration_ms: float
+    sample_count: int
+    interval_ms: float
+    stages: List[ProfileStage]
+    memory: Dict[str, int]
+    allocations: Optional[List[ProfileAllocation]] = None
+
+
+class ProfilesResponse(BaseModel):
+    profiles: List[ProfileInfo]
+
+
+class ProfileArmResponse(BaseModel):
+    armed: Dict[str, int]
+
+
 class MessageSchema(BaseModel):
     id: int
     conversation_token: str
@@ -73,6 +130,23 @@ class MessagesResponse(BaseModel):
         from_attributes = True
 
 
+class MessageSearchResult(BaseModel):
+    message_id: int
+    conversation_token: str
+    conversation_name: str
+    role: str
+    snippet: str
+    score: float
+    created_at: datetime
+
+
+class MessageSearchResponse(BaseModel):
+    results: List[MessageSearchResult]
+    limit: int
+    offset: int
+    has_more: bool
+
+
 class ConversationSchema(BaseModel):
     token: str
     name: str
@@ -1,9 +1,11 @@
 from fastapi import APIRouter
 
-from routes import chat, document, conversation
+from routes import chat, document, conversation, snapshot, profile
 
 api_router = APIRouter()
 
 api_router.include_router(chat.router, tags=["chats"])
 api_router.include_router(document.router, tags=["documents"])
 api_router.include_router(conversation.router, tags=["conversations"])
+api_router.include_router(snapshot.router, tags=["snapshots"])
+api_router.include_router(profile.router, tags=["profiles"])
@@ -1,66 +1,181 @@
+import time
 import uuid
 
 from fastapi import Depends, APIRouter, HTTPException
 from fastapi.logger import logger
 
+from config import settings
 from db import Conversation, Message
 from db.session import get_session
 from models.schemas import ChatRequest, MessageSchema, ChatResponse
+from services.container import (
+    get_rag_pipeline,
+    get_conversation_cache,
+    get_message_writer,
+)
+from services.conversation_cache import ConversationState
 from services.conversation_name_generator import ConversationNameGenerator
-from services.rag_pipeline import RAGPipeline
-from services.vector_store import VectorStore
+from services.message_writer import utc_now
+from services import profiling
+from services.task_graph import TaskGraph
 
 router = APIRouter()
 
-vector_store = VectorStore()
-rag_pipeline = RAGPipeline(vector_store)
+
+def _load_conversation(Session, conversation_token: str, cached=None):
+    """Load a conversation's history from the database, or None if it is new.
+
+    A cached state is returned as-is when the database holds the same number
+    of messages; otherwise another worker extended the conversation and the
+    history is reloaded.
+    """
+    with Session as session:
+        if cached is not None:
+            if Message.count(session, conversation_token) == len(cached.history):
+                return cached
+
+        conversation = (
+            session.query(Conversation).filter_by(token=conversation_token).first()
+        )
+        if not conversation:
+            return None
+
+        messages = [MessageSchema.from_orm(message) for message in conversation.messages]
+        return ConversationState.from_messages(
+            conversation.token, conversation.name, messages
+        )
 
 
 @router.post("/api/chat")
-async def chat(request: ChatRequest, Session=Depends(get_session)):
+async def chat(
+    request: ChatRequest,
+    profile=Depends(profiling.profile_request),
+    Session=Depends(get_session),
+    rag_pipeline=Depends(get_rag_pipeline),
+    conversation_cache=Depends(get_conversation_cache),
+    message_writer=Depends(get_message_writer),
+):
     """Process chat request and return AI response"""
     try:
-        with Session as session:
-            conversation_token = request.conversation_token or str(uuid.uuid4())
-            conversation = (
-                session.query(Conversation).filter_by(token=conversation_token).first()
+        start_time = time.time()
+        conversation_token = request.conversation_token or str(uuid.uuid4())
+        question = request.question
+        created_at = utc_now()
+
+        # Independent stages run concurrently: the question is embedded while
+        # the history loads. Nothing is persisted until an answer exists.
+        graph = TaskGraph()
+
+        async def history():
+            # Active conversations are served from the cache. With several
+            # workers it is checked against the DB, in case another worker
+            # handled a turn.
+            if not request.conversation_token:
+                return None, []
+            cached = conversation_cache.get(conversation_token)
+            if cached is not None and not settings.conversation_cache_check_db:
+                return cached, list(cached.history)
+
+            def load():
+                # Make sure writes queued by this worker are visible
+                if cached is None or message_writer.pending_messages(
+                    conversation_token
+                ):
+                    message_writer.flush()
+                return _load_conversation(Session, conversation_token, cached)
+
+            state = await profiling.to_thread(load)
+            if state is None:
+                conversation_cache.invalidate(conversation_token)
+            elif state is not cached:
+                conversation_cache.put(state)
+            return state, list(state.history) if state else []
+
+        async def query_embedding():
+            return await profiling.to_thread(rag_pipeline.embed_query, question)
+
+        async def retrieval(query_embedding):
+            # Starts as soon as the embedding lands, without waiting for a rewrite
+            return await profiling.to_thread(
+                rag_pipeline.retrieve, question, query_embedding
             )
 
-            chat_history = []
-            if conversation:
-                chat_history = [
-                    MessageSchema.from_orm(message) for message in conversation.messages
-                ]
+        async def rewrite(history):
+            # The rewrite is optional; answer the original question if it fails
+            try:
+                rewritten = await rag_pipeline.arewrite_question(question, history[1])
+            except Exception as e:
+                logger.error(f"Error rewriting question: {str(e)}")
+                return None
+            if not rewritten:
+                return None
+            # The rewritten question needs its own embedding
+            return await profiling.to_thread(rag_pipeline.retrieve, rewritten)
 
-            result = rag_pipeline.generate_answer(
-                question=request.question,
-                chat_history=chat_history,
+        async def context(retrieval, rewrite=None):
+            return rewrite if rewrite is not None else retrieval
+
+        async def generation(history, context):
+            return await rag_pipeline.agenerate_llm_response(
+                question, context, history[1]
             )
 
-            if not conversation:
-                name = ConversationNameGenerator(
-                    request.question, result["answer"]
-                ).generate()
-                conversation = Conversation(name=name, token=conversation_token)
-                session.add(conversation)
-                session.commit()
+        async def title(history, generation):
+            # Only the first exchange of a conversation names it
+            if history[0] is not None and history[0].name:
+                return history[0].name
+            return await ConversationNameGenerator(question, generation).agenerate()
+
+        async def persist(history, generation, title):
+            state = history[0]
+            if state is None:
+                message_writer.add_conversation(conversation_token, title)
+                state = ConversationState(conversation_token, title)
+                conversation_cache.put(state)
+            elif state.name != title:
+                message_writer.rename_conversation(conversation_token, title)
+                state.name = title
 
-            user_message = Message(
-                conversation=conversation, role="user", content=request.question
+            message_writer.add_message(
+                conversation_token, "user", question, created_at
             )
-            assistant_message = Message(
-                conversation=conversation, role="assistant", content=result["answer"]
+            message_writer.add_message(
+                conversation_token, "assistant", generation, created_at
             )
-            session.add_all([user_message, assistant_message])
-            session.commit()
-
-            return ChatResponse(
-                answer=result["answer"],
-                sources=result["sources"],
-                processing_time=result["processing_time"],
-                conversation_token=conversation_token,
-                created_at=assistant_message.created_at,
+            conversation_cache.append(conversation_token, "user", question)
+            conversation_cache.append(conversation_token, "assistant", generation)
+
+        context_deps = ["retrieval"]
+        graph.add("history", history)
+        graph.add("query_embedding", query_embedding)
+        graph.add("retrieval", retrieval, deps=["query_embedding"])
+        if settings.query_rewrite_enabled:
+            # Races the retrieval of the original question; its results are
+            # only used if the rewrite and its retrieval finish in time
+            graph.add(
+                "rewrite",
+                rewrite,
+                deps=["history"],
+                timeout=settings.query_rewrite_timeout_ms / 1000,
+                default=None,
             )
+            context_deps.append("rewrite")
+        graph.add("context", context, deps=context_deps)
+        graph.add("generation", generation, deps=["history", "context"])
+        graph.add("title", title, deps=["history", "generation"])
+        graph.add("persist", persist, deps=["history", "generation", "title"])
+
+        results = await graph.run()
+
+        return ChatResponse(
+            answer=results["generation"],
+            sources=rag_pipeline.build_sources(results["context"]),
+            processing_time=time.time() - start_time,
+            conversation_token=conversation_token,
+            created_at=created_at,
+            timings=graph.timings,
+            critical_path=graph.critical_path(),
+        )
 
     except Exception as e:
         logger.error(f"Error processing chat request: {str(e)}")
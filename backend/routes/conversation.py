@@ -1,16 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import desc
 
-from db import Conversation
+from db import Conversation, Message
 from db.session import get_session
-from models.schemas import ConversationSchema, MessageSchema, MessagesResponse
+from services.container import get_message_writer
+from models.schemas import (
+    ConversationSchema,
+    MessageSchema,
+    MessagesResponse,
+    MessageSearchResult,
+    MessageSearchResponse,
+)
 
 router = APIRouter()
 
 
 @router.get("/api/conversations")
-async def get_conversations(Session=Depends(get_session)):
+async def get_conversations(
+    Session=Depends(get_session), message_writer=Depends(get_message_writer)
+):
     """Get list of conversations"""
+    await asyncio.to_thread(message_writer.flush)
     with Session as session:
         conversations = (
             session.query(Conversation).order_by(desc(Conversation.created_at)).all()
@@ -25,9 +37,32 @@ async def get_conversations(Session=Depends(get_session)):
         return conversations_data
 
 
+@router.get("/api/conversations/search")
+async def search_messages(
+    q: str = Query(min_length=1, max_length=500),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+    Session=Depends(get_session),
+    message_writer=Depends(get_message_writer),
+):
+    """Search messages across all conversations"""
+    await asyncio.to_thread(message_writer.flush)
+    with Session as session:
+        # Fetch one extra row to know whether another page exists without counting
+        rows = Message.search(session, q, limit=limit + 1, offset=offset)
+
+        results = [MessageSearchResult(**row) for row in rows[:limit]]
+        return MessageSearchResponse(
+            results=results, limit=limit, offset=offset, has_more=len(rows) > limit
+        )
+
+
 @router.get("/api/conversations/{token}/messages")
-async def get_messages(token, Session=Depends(get_session)):
+async def get_messages(
+    token, Session=Depends(get_session), message_writer=Depends(get_message_writer)
+):
     """Get list of conversations"""
+    await asyncio.to_thread(message_writer.flush)
     with Session as session:
         conversation = session.query(Conversation).filter_by(token=token).first()
 
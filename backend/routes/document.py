@@ -1,22 +1,41 @@
 import os
 import time
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi import (
+    APIRouter,
+    UploadFile,
+    File,
+    HTTPException,
+    Query,
+    Depends,
+    BackgroundTasks,
+)
 from fastapi.logger import logger
 
 from config import settings
 from models.schemas import UploadResponse, DocumentsResponse, ChunksResponse
-from services.pdf_processor import PDFProcessor
-from services.vector_store import VectorStore
+from services.container import services, get_pdf_processor, get_vector_store
+from services import profiling
 
 router = APIRouter()
 
-pdf_processor = PDFProcessor()
-vector_store = VectorStore()
+
+def _summarize_document(source, pages_content):
+    """Background job building the summary nodes of an uploaded document"""
+    try:
+        services.document_summarizer.summarize(source, pages_content)
+    except Exception as e:
+        logger.error(f"Error summarizing {source}: {str(e)}")
 
 
 @router.post("/api/upload")
-async def upload_pdf(file: UploadFile = File(...)):
+async def upload_pdf(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    profile=Depends(profiling.profile_request),
+    pdf_processor=Depends(get_pdf_processor),
+    vector_store=Depends(get_vector_store),
+):
     """Upload and process PDF file"""
     try:
         if not file.filename.lower().endswith(".pdf"):
@@ -29,9 +48,18 @@ async def upload_pdf(file: UploadFile = File(...)):
 
         start_time = time.time()
 
-        documents = pdf_processor.process_pdf(file_path)
+        with profiling.stage("extract"):
+            pages_content = pdf_processor.extract_text_from_pdf(file_path)
+        with profiling.stage("split"):
+            documents = pdf_processor.split_into_chunks(pages_content)
+
+        with profiling.stage("index"):
+            vector_store.add_documents(documents)
 
-        vector_store.add_documents(documents)
+        if settings.summaries_enabled:
+            background_tasks.add_task(
+                _summarize_document, os.path.basename(file_path), pages_content
+            )
 
         processing_time = time.time() - start_time
 
@@ -48,7 +76,7 @@ async def upload_pdf(file: UploadFile = File(...)):
 
 
 @router.get("/api/documents")
-async def get_documents():
+async def get_documents(vector_store=Depends(get_vector_store)):
     """Get list of processed documents"""
     try:
         documents = vector_store.get_document_info()
@@ -62,7 +90,9 @@ async def get_documents():
 
 @router.get("/api/documents/chunks")
 async def get_chunks(
-    limit: int = Query(default=100, ge=1, le=1000), offset: int = Query(default=0, ge=0)
+    limit: int = Query(default=100, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+    vector_store=Depends(get_vector_store),
 ):
     """Get document chunks with pagination"""
     try:
@@ -76,7 +106,7 @@ async def get_chunks(
 
 
 @router.delete("/api/documents")
-async def clear_all_documents():
+async def clear_all_documents(vector_store=Depends(get_vector_store)):
     """Clear all data including vector store and uploaded files"""
     try:
         result = vector_store.clear_all(settings.pdf_upload_path)
@@ -88,3 +118,42 @@ async def clear_all_documents():
     except Exception as e:
         logger.error(f"Error clearing data: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/api/documents/{source}")
+async def delete_document(
+    source: str,
+    background_tasks: BackgroundTasks,
+    pdf_processor=Depends(get_pdf_processor),
+    vector_store=Depends(get_vector_store),
+):
+    """Delete one document's chunks, summaries, cached pages and uploaded file"""
+    try:
+        source = os.path.basename(source)
+        file_path = os.path.join(settings.pdf_upload_path, source)
+
+        deleted_chunks = vector_store.delete_document(source)
+
+        deleted_file = False
+        if os.path.isfile(file_path):
+            pdf_processor.forget_pages(file_path)
+            os.unlink(file_path)
+            deleted_file = True
+
+        if not deleted_chunks and not deleted_file:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        # Rebuilds the index in the background once enough chunks were deleted
+        background_tasks.add_task(vector_store.maybe_compact)
+
+        return {
+            "message": "Document deleted successfully",
+            "filename": source,
+            "deleted_chunks": deleted_chunks,
+            "deleted_file": deleted_file,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error deleting document: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
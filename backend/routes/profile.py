@@ -0,0 +1,71 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.logger import logger
+from fastapi.responses import FileResponse
+
+from config import settings
+from models.schemas import ProfileArmResponse, ProfileInfo, ProfilesResponse
+from services.profiling import profiler
+
+router = APIRouter()
+
+PROFILED_PATHS = ("/api/chat", "/api/upload")
+
+
+def _check_enabled():
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+
+
+@router.post("/api/profiles/arm")
+async def arm_profiling(
+    path: str = Query(default="/api/chat"),
+    count: int = Query(default=1, ge=1, le=100),
+):
+    """Profile the next requests to an endpoint"""
+    _check_enabled()
+    if path not in PROFILED_PATHS:
+        raise HTTPException(
+            status_code=400, detail=f"Only {', '.join(PROFILED_PATHS)} can be profiled"
+        )
+    return ProfileArmResponse(armed=profiler.arm(path, count))
+
+
+@router.get("/api/profiles")
+async def get_profiles():
+    """Get list of stored profiles, newest first"""
+    _check_enabled()
+    try:
+        profiles = profiler.store.list_profiles()
+        return ProfilesResponse(
+            profiles=[ProfileInfo(**profile) for profile in profiles]
+        )
+    except Exception as e:
+        logger.error(f"Error listing profiles: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/api/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """Get a profile with its stages and top allocations"""
+    _check_enabled()
+    try:
+        return ProfileInfo(**profiler.store.load(profile_id))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error getting profile {profile_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/api/profiles/{profile_id}/flamegraph")
+async def get_flamegraph(profile_id: str):
+    """Download a profile's samples as folded stacks"""
+    _check_enabled()
+    try:
+        return FileResponse(
+            profiler.store.flamegraph_path(profile_id),
+            media_type="text/plain",
+            filename=f"{profile_id}.folded",
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
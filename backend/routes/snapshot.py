@@ -0,0 +1,58 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.logger import logger
+
+from models.schemas import SnapshotInfo, SnapshotsResponse
+from services.container import get_snapshot_manager
+from services.snapshot import SnapshotError
+
+router = APIRouter()
+
+
+@router.post("/api/snapshots")
+async def export_snapshot(
+    incremental: bool = Query(default=False),
+    snapshot_manager=Depends(get_snapshot_manager),
+):
+    """Export the vector index to a snapshot file"""
+    try:
+        info = await asyncio.to_thread(snapshot_manager.export, incremental)
+        return SnapshotInfo(**info)
+    except Exception as e:
+        logger.error(f"Error exporting snapshot: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/api/snapshots")
+async def get_snapshots(snapshot_manager=Depends(get_snapshot_manager)):
+    """Get list of snapshots, newest first"""
+    try:
+        snapshots = await asyncio.to_thread(snapshot_manager.list_snapshots)
+        return SnapshotsResponse(
+            snapshots=[SnapshotInfo(**snapshot) for snapshot in snapshots]
+        )
+    except Exception as e:
+        logger.error(f"Error listing snapshots: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/api/snapshots/{snapshot_id}/import")
+async def import_snapshot(
+    snapshot_id: str,
+    force: bool = Query(default=False),
+    snapshot_manager=Depends(get_snapshot_manager),
+):
+    """Load a snapshot into the vector index"""
+    try:
+        info = await asyncio.to_thread(
+            snapshot_manager.import_snapshot, snapshot_id, force
+        )
+        return SnapshotInfo(**info)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except SnapshotError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error importing snapshot: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,166 @@
+import logging
+import threading
+import time
+from typing import Dict
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """Lazily builds and caches the heavy services shared by all routes.
+
+    Services are created on first access (or by ``warm_up`` from the app
+    lifespan), so importing the routes never opens Chroma or the OpenAI clients.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._services: Dict[str, object] = {}
+        self._init_times: Dict[str, float] = {}
+
+    def _get(self, name: str, factory):
+        service = self._services.get(name)
+        if service is not None:
+            return service
+
+        with self._lock:
+            service = self._services.get(name)
+            if service is None:
+                start_time = time.time()
+                service = factory()
+                self._init_times[name] = time.time() - start_time
+                self._services[name] = service
+                logger.info(
+                    f"Initialized {name} in {self._init_times[name]:.3f}s"
+                )
+        return service
+
+    @property
+    def vector_store(self):
+        def factory():
+            if settings.vector_store_mode == "client":
+                from services.vector_client import VectorStoreClient
+
+                return VectorStoreClient()
+
+            from services.vector_store import VectorStore
+
+            return VectorStore()
+
+        return self._get("vector_store", factory)
+
+    @property
+    def pdf_processor(self):
+        def factory():
+            from services.pdf_processor import PDFProcessor
+
+            page_cache = None
+            if settings.page_cache_enabled:
+                from services.page_cache import PageCache
+
+                page_cache = PageCache()
+            return PDFProcessor(page_cache=page_cache)
+
+        return self._get("pdf_processor", factory)
+
+    @property
+    def rag_pipeline(self):
+        def factory():
+            from services.rag_pipeline import RAGPipeline
+
+            return RAGPipeline(self.vector_store)
+
+        return self._get("rag_pipeline", factory)
+
+    @property
+    def document_summarizer(self):
+        def factory():
+            from services.document_summarizer import DocumentSummarizer
+
+            return DocumentSummarizer(self.vector_store)
+
+        return self._get("document_summarizer", factory)
+
+    @property
+    def snapshot_manager(self):
+        def factory():
+            from services.snapshot import SnapshotManager
+
+            return SnapshotManager(self.vector_store)
+
+        return self._get("snapshot_manager", factory)
+
+    @property
+    def conversation_cache(self):
+        def factory():
+            from services.conversation_cache import ConversationCache
+
+            return ConversationCache()
+
+        return self._get("conversation_cache", factory)
+
+    @property
+    def message_writer(self):
+        def factory():
+            from db.session import SessionFactory
+            from services.message_writer import MessageWriter
+
+            return MessageWriter(SessionFactory)
+
+        return self._get("message_writer", factory)
+
+    def shutdown(self) -> None:
+        """Flush pending writes before the process exits."""
+        message_writer = self._services.get("message_writer")
+        if message_writer is not None:
+            message_writer.close()
+
+    def warm_up(self) -> None:
+        """Build every service so the first request does not pay for it."""
+        self.vector_store
+        self.pdf_processor
+        self.rag_pipeline
+
+    @property
+    def ready(self) -> bool:
+        return all(
+            name in self._services
+            for name in ("vector_store", "pdf_processor", "rag_pipeline")
+        )
+
+    @property
+    def init_times(self) -> Dict[str, float]:
+        return dict(self._init_times)
+
+
+services = ServiceContainer()
+
+
+def get_vector_store():
+    return services.vector_store
+
+
+def get_pdf_processor():
+    return services.pdf_processor
+
+
+def get_rag_pipeline():
+    return services.rag_pipeline
+
+
+def get_document_summarizer():
+    return services.document_summarizer
+
+
+def get_snapshot_manager():
+    return services.snapshot_manager
+
+
+def get_conversation_cache():
+    return services.conversation_cache
+
+
+def get_message_writer():
+    return services.message_writer
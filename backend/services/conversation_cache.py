@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional, TYPE_CHECKING
+
+from config import settings
+
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+    from models.schemas import MessageSchema
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.encoding_for_model(settings.llm_model)
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count for the configured LLM, estimated when tiktoken can't tell"""
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+class ConversationState:
+    """Prebuilt chat history of one active conversation"""
+
+    __slots__ = ("token", "name", "history", "token_count", "last_access")
+
+    def __init__(self, token: str, name: str):
+        self.token = token
+        self.name = name
+        self.history: List[BaseMessage] = []
+        self.token_count = 0
+        self.last_access = time.monotonic()
+
+    @classmethod
+    def from_messages(
+        cls, token: str, name: str, messages: List[MessageSchema]
+    ) -> "ConversationState":
+        state = cls(token, name)
+        for message in messages:
+            state.append(message.role, message.content)
+        return state
+
+    def append(self, role: str, content: str) -> None:
+        from langchain_core.messages import AIMessage, HumanMessage
+
+        if role == "user":
+            self.history.append(HumanMessage(content=content))
+        elif role == "assistant":
+            self.history.append(AIMessage(content=content))
+        else:
+            return
+        self.token_count += count_tokens(content)
+
+
+class ConversationCache:
+    """LRU cache of active conversations, bounded by entry count and idle TTL"""
+
+    def __init__(
+        self,
+        max_entries: int = settings.conversation_cache_size,
+        ttl_seconds: float = settings.conversation_cache_ttl_seconds,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, ConversationState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict_expired(self, now: float) -> None:
+        # Entries are kept in access order, so expired ones are at the front
+        while self._entries:
+            token, state = next(iter(self._entries.items()))
+            if now - state.last_access < self.ttl_seconds:
+                break
+            del self._entries[token]
+
+    def get(self, token: str) -> Optional[ConversationState]:
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            state = self._entries.get(token)
+            if state is not None:
+                state.last_access = now
+                self._entries.move_to_end(token)
+            return state
+
+    def put(self, state: ConversationState) -> None:
+        now = time.monotonic()
+        with self._lock:
+            state.last_access = now
+            self._entries[state.token] = state
+            self._entries.move_to_end(state.token)
+            self._evict_expired(now)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def append(self, token: str, role: str, content: str) -> None:
+        with self._lock:
+            state = self._entries.get(token)
+            if state is not None:
+                state.append(role, content)
+
+    def invalidate(self, token: str) -> None:
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
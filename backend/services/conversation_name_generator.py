@@ -1,11 +1,11 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
-
 from config import settings
 
 
 class ConversationNameGenerator:
     def __init__(self, question: str, answer: str):
+        from langchain_core.prompts import ChatPromptTemplate
+        from langchain_openai import ChatOpenAI
+
         self.llm = ChatOpenAI(
             openai_api_key=settings.openai_api_key,
             model=settings.llm_model,
@@ -30,3 +30,7 @@ class ConversationNameGenerator:
     def generate(self):
         prompt = self.prompt.format_messages()
         return self.llm.invoke(prompt).content
+
+    async def agenerate(self):
+        prompt = self.prompt.format_messages()
+        return (await self.llm.ainvoke(prompt)).content
@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import logging
+import re
+import time
+from typing import List, Dict, Any, TYPE_CHECKING
+
+from config import settings
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+SECTION_SUMMARY = "section_summary"
+DOCUMENT_SUMMARY = "document_summary"
+SUMMARY_NODE_TYPES = [SECTION_SUMMARY, DOCUMENT_SUMMARY]
+
+NOTE_HEADING = re.compile(r"^notes?\s+\d+[a-z]?\b", re.IGNORECASE)
+STATEMENT_HEADING = re.compile(
+    r"^(consolidated\s+|separate\s+)?(statements?\s+of\s+\w+|balance\s+sheets?|"
+    r"income\s+statements?|cash\s+flows?\s+statements?|notes\s+to\s+the\s+\w+)",
+    re.IGNORECASE,
+)
+NUMBERED_HEADING = re.compile(r"^\d{1,2}(\.\d{1,2})*\.?\s+[A-Z][^.:;]{2,80}$")
+
+BROAD_QUESTION = re.compile(
+    r"\b(summar\w*|overview|overall|highlights?|key\s+(points|takeaways|findings)|"
+    r"main\s+(points|themes|topics)|in\s+general|tl;?dr)\b",
+    re.IGNORECASE,
+)
+
+
+def is_broad_question(question: str) -> bool:
+    """Whether the question asks for an overview rather than a specific fact"""
+    return bool(BROAD_QUESTION.search(question))
+
+
+def _is_heading(line: str) -> bool:
+    if not 3 <= len(line) <= 90 or line.endswith((".", ",")):
+        return False
+    if NOTE_HEADING.match(line) or STATEMENT_HEADING.match(line):
+        return True
+    if NUMBERED_HEADING.match(line):
+        return True
+
+    letters = [char for char in line if char.isalpha()]
+    return (
+        len(letters) >= 4
+        and len(line.split()) <= 12
+        and sum(char.isupper() for char in letters) / len(letters) > 0.9
+    )
+
+
+def detect_sections(pages_content: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Split page-wise PDF text into sections at detected headings"""
+    sections = []
+    current = None
+
+    for page in pages_content:
+        page_number = page["page_number"]
+        for raw_line in page["content"].splitlines():
+            line = raw_line.strip()
+            if not line:
+                continue
+
+            if _is_heading(line):
+                current = {
+                    "title": line,
+                    "start_page": page_number,
+                    "end_page": page_number,
+                    "lines": [],
+                }
+                sections.append(current)
+                continue
+
+            if current is None:
+                current = {
+                    "title": "Introduction",
+                    "start_page": page_number,
+                    "end_page": page_number,
+                    "lines": [],
+                }
+                sections.append(current)
+
+            current["lines"].append(line)
+            current["end_page"] = page_number
+
+    # Fold sections too short to summarize on their own into the previous one
+    merged = []
+    for section in sections:
+        text = "\n".join(section.pop("lines"))
+        section["text"] = text
+        if merged and len(text) < settings.summary_min_section_chars:
+            previous = merged[-1]
+            previous["text"] = f"{previous['text']}\n{section['title']}\n{text}".strip()
+            previous["end_page"] = section["end_page"]
+        elif text:
+            merged.append(section)
+
+    return merged
+
+
+def split_text(text: str, max_chars: int) -> List[str]:
+    """Split text into parts of at most ``max_chars``, at line boundaries if possible"""
+    parts = []
+    current = ""
+    for line in text.splitlines():
+        while len(line) > max_chars:
+            if current:
+                parts.append(current)
+                current = ""
+            parts.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and len(current) + len(line) + 1 > max_chars:
+            parts.append(current)
+            current = ""
+        current = f"{current}\n{line}" if current else line
+    if current:
+        parts.append(current)
+    return parts
+
+
+def pack_texts(texts: List[str], max_chars: int) -> List[List[str]]:
+    """Group consecutive texts so each group's joined length stays within ``max_chars``"""
+    groups = []
+    current: List[str] = []
+    length = 0
+    for text in texts:
+        if current and length + len(text) + 2 > max_chars:
+            groups.append(current)
+            current, length = [], 0
+        current.append(text)
+        length += len(text) + 2
+    if current:
+        groups.append(current)
+    return groups
+
+
+class DocumentSummarizer:
+    def __init__(self, vector_store):
+        """Initialize the summarization LLM and prompts"""
+        from langchain_core.prompts import ChatPromptTemplate
+        from langchain_openai import ChatOpenAI
+
+        self.vector_store = vector_store
+        self.llm = ChatOpenAI(
+            openai_api_key=settings.openai_api_key,
+            model=settings.summary_model or settings.llm_model,
+            temperature=0,
+            max_tokens=settings.max_tokens,
+        )
+
+        self.section_prompt = ChatPromptTemplate.from_messages(
+            [
+                (
+                    "system",
+                    """
+                    You summarize one section of a financial statement.
+                    Keep every figure, period and entity name that matters, and do not add information.
+                    Answer with at most 8 concise bullet points.
+                    """.strip(),
+                ),
+                ("user", "Section: {title} (pages {start_page}-{end_page})\n\n{text}"),
+            ]
+        )
+
+        self.combine_prompt = ChatPromptTemplate.from_messages(
+            [
+                (
+                    "system",
+                    """
+                    You merge summaries of consecutive parts of a financial document into one summary.
+                    Keep every figure, period and entity name that matters, and do not add information.
+                    Use concise bullet points.
+                    """.strip(),
+                ),
+                ("user", "{heading}\n\n{summaries}"),
+            ]
+        )
+
+        self.document_prompt = ChatPromptTemplate.from_messages(
+            [
+                (
+                    "system",
+                    """
+                    You write the overall summary of a financial document from its section summaries.
+                    Cover the key figures, performance, financial position, risks and notable events.
+                    Do not add information. Use bullet points grouped by topic.
+                    """.strip(),
+                ),
+                ("user", "Document: {source}\n\n{section_summaries}"),
+            ]
+        )
+
+    def _batch(self, prompts) -> List[str]:
+        responses = self.llm.batch(
+            prompts, config={"max_concurrency": settings.summary_max_concurrency}
+        )
+        return [response.content for response in responses]
+
+    def _reduce(self, heading: str, texts: List[str]) -> List[str]:
+        """Merge summaries in rounds until they fit into a single prompt"""
+        max_chars = settings.summary_section_max_chars
+        while True:
+            groups = pack_texts(texts, max_chars)
+            if len(groups) == 1:
+                return texts
+            if len(groups) == len(texts):
+                # Every summary fills a prompt on its own; still halve the count
+                groups = [texts[i : i + 2] for i in range(0, len(texts), 2)]
+            texts = self._batch(
+                [
+                    self.combine_prompt.format_messages(
+                        heading=heading, summaries="\n\n".join(group)
+                    )
+                    for group in groups
+                ]
+            )
+
+    def _summarize_sections(self, sections: List[Dict[str, Any]]) -> List[str]:
+        # Long sections are summarized part by part, all parts in one batch
+        parts = []
+        for index, section in enumerate(sections):
+            texts = split_text(section["text"], settings.summary_section_max_chars)
+            for number, text in enumerate(texts, start=1):
+                title = section["title"]
+                if len(texts) > 1:
+                    title = f"{title} (part {number} of {len(texts)})"
+                parts.append((index, title, text))
+
+        part_summaries = self._batch(
+            [
+                self.section_prompt.format_messages(
+                    title=title,
+                    start_page=sections[index]["start_page"],
+                    end_page=sections[index]["end_page"],
+                    text=text,
+                )
+                for index, title, text in parts
+            ]
+        )
+
+        summaries: List[List[str]] = [[] for _ in sections]
+        for (index, _, _), summary in zip(parts, part_summaries):
+            summaries[index].append(summary)
+
+        results = []
+        for section, section_summaries in zip(sections, summaries):
+            if len(section_summaries) == 1:
+                results.append(section_summaries[0])
+                continue
+            heading = f"Section: {section['title']}"
+            texts = self._reduce(heading, section_summaries)
+            prompt = self.combine_prompt.format_messages(
+                heading=heading, summaries="\n\n".join(texts)
+            )
+            results.append(self.llm.invoke(prompt).content)
+        return results
+
+    def _summarize_document(
+        self, source: str, sections: List[Dict[str, Any]], summaries: List[str]
+    ) -> str:
+        section_summaries = [
+            f"## {section['title']} "
+            f"(pages {section['start_page']}-{section['end_page']})\n{summary}"
+            for section, summary in zip(sections, summaries)
+        ]
+        # Reduce hierarchically instead of truncating, so every section counts
+        texts = self._reduce(f"Document: {source}", section_summaries)
+        prompt = self.document_prompt.format_messages(
+            source=source, section_summaries="\n\n".join(texts)
+        )
+        return self.llm.invoke(prompt).content
+
+    def build_summary_nodes(
+        self, source: str, pages_content: List[Dict[str, Any]]
+    ) -> List[Document]:
+        """Build hierarchical summary documents: one per section and one per document"""
+        from langchain_core.documents import Document
+
+        sections = detect_sections(pages_content)
+        if not sections:
+            return []
+
+        section_summaries = self._summarize_sections(sections)
+        document_summary = self._summarize_document(source, sections, section_summaries)
+
+        nodes = [
+            Document(
+                page_content=document_summary,
+                metadata={
+                    "source": source,
+                    "page": sections[0]["start_page"],
+                    "end_page": sections[-1]["end_page"],
+                    "node_type": DOCUMENT_SUMMARY,
+                    "section": "Document summary",
+                },
+            )
+        ]
+        for section, summary in zip(sections, section_summaries):
+            nodes.append(
+                Document(
+                    page_content=f"{section['title']}\n{summary}",
+                    metadata={
+                        "source": source,
+                        "page": section["start_page"],
+                        "end_page": section["end_page"],
+                        "node_type": SECTION_SUMMARY,
+                        "section": section["title"],
+                    },
+                )
+            )
+        return nodes
+
+    def summarize(self, source: str, pages_content: List[Dict[str, Any]]) -> int:
+        """Summarize a document and store its summary nodes, replacing older ones"""
+        try:
+            start_time = time.time()
+
+            nodes = self.build_summary_nodes(source, pages_content)
+            self.vector_store.replace_summary_nodes(source, nodes)
+
+            logger.info(
+                f"Stored {len(nodes)} summary nodes for {source} "
+                f"in {time.time() - start_time:.1f}s"
+            )
+            return len(nodes)
+        except Exception as e:
+            logger.error(f"Error summarizing document {source}: {str(e)}")
+            raise
@@ -0,0 +1,447 @@
+import glob
+import json
+import logging
+import os
+import shutil
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import List, Dict, Any, Tuple
+
+from config import settings
+from services.document_summarizer import SUMMARY_NODE_TYPES
+
+logger = logging.getLogger(__name__)
+
+# PDF processor of the current worker process, built once by _init_worker
+_worker_processor = None
+
+
+def chunk_id_prefix(source: str, digest: str) -> str:
+    """Prefix shared by the chunk ids of one version of a file"""
+    return f"{source}:{digest[:16]}:"
+
+
+def chunk_id(source: str, digest: str, page: int, index: int) -> str:
+    """Deterministic chunk id, so re-indexing the same file upserts in place"""
+    return f"{chunk_id_prefix(source, digest)}{page}:{index}"
+
+
+def _init_worker() -> None:
+    global _worker_processor
+
+    from services.page_cache import PageCache
+    from services.pdf_processor import PDFProcessor
+
+    _worker_processor = PDFProcessor(page_cache=PageCache())
+
+
+def chunk_file(file_path: str, cache_only: bool = False) -> Dict[str, Any]:
+    """Load the pages of one PDF (from the page cache when possible) and chunk them.
+
+    Runs inside a worker process; only plain texts and metadata are sent back.
+    """
+    from services.page_cache import file_hash
+
+    processor = _worker_processor
+    source = os.path.basename(file_path)
+    digest = file_hash(file_path)
+
+    pages = processor.page_cache.get(digest)
+    cache_hit = pages is not None
+    if pages is None:
+        if cache_only:
+            return {"source": source, "digest": digest, "missing": True}
+        pages = processor.load_pages(file_path, digest=digest)
+
+    for page in pages:
+        page["metadata"] = {"source": source, "page": page["page_number"]}
+
+    ids, texts, metadatas = [], [], []
+    page_counters: Dict[int, int] = {}
+    for document in processor.split_into_chunks(pages):
+        page = document.metadata["page"]
+        index = page_counters.get(page, 0)
+        page_counters[page] = index + 1
+
+        ids.append(chunk_id(source, digest, page, index))
+        texts.append(document.page_content)
+        metadatas.append(document.metadata)
+
+    return {
+        "source": source,
+        "digest": digest,
+        "missing": False,
+        "cache_hit": cache_hit,
+        "pages": len(pages),
+        "ids": ids,
+        "texts": texts,
+        "metadatas": metadatas,
+    }
+
+
+def _chunk_file_task(task: Tuple[str, bool]) -> Dict[str, Any]:
+    return chunk_file(*task)
+
+
+def embed_in_batches(embeddings, texts: List[str]) -> List[List[float]]:
+    """Embed texts in provider-sized batches, several batches in flight at once"""
+    batch_size = settings.embedding_batch_size
+    batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+
+    vectors: List[List[float]] = []
+    with ThreadPoolExecutor(max_workers=settings.embedding_max_workers) as pool:
+        for batch_vectors in pool.map(embeddings.embed_documents, batches):
+            vectors.extend(batch_vectors)
+    return vectors
+
+
+def _rate(count: int, seconds: float) -> float:
+    return round(count / seconds, 2) if seconds > 0 else 0.0
+
+
+class Reindexer:
+    """Rebuilds the vector index from the page cache with the current settings.
+
+    Chunking runs in worker processes and embedding requests run concurrently;
+    pdfplumber only runs for files missing from the cache. Only one embedding
+    buffer is held in memory at a time.
+    """
+
+    def __init__(self, vector_store, upload_path: str = settings.pdf_upload_path):
+        self.vector_store = vector_store
+        self.upload_path = upload_path
+
+    def _pdf_files(self) -> List[str]:
+        return sorted(
+            os.path.join(self.upload_path, filename)
+            for filename in os.listdir(self.upload_path)
+            if filename.lower().endswith(".pdf")
+        )
+
+    def run(self, cache_only: bool = False, progress: bool = True) -> Dict[str, Any]:
+        from tqdm import tqdm
+
+        start_time = time.time()
+        files = self._pdf_files()
+
+        buffer: Dict[str, List] = {"ids": [], "texts": [], "metadatas": []}
+        totals = {"pages": 0, "cache_hits": 0, "chunks": 0, "embed_seconds": 0.0}
+        flush_size = settings.embedding_batch_size * settings.embedding_max_workers
+
+        def flush(name: str) -> None:
+            if not buffer["ids"]:
+                return
+            embed_start = time.time()
+            vectors = embed_in_batches(self.vector_store.embeddings, buffer["texts"])
+            self.vector_store.upsert_rebuild(
+                name, buffer["ids"], vectors, buffer["texts"], buffer["metadatas"]
+            )
+            totals["embed_seconds"] += time.time() - embed_start
+            for values in buffer.values():
+                values.clear()
+
+        def add(ids, texts, metadatas, name: str) -> None:
+            buffer["ids"].extend(ids)
+            buffer["texts"].extend(texts)
+            buffer["metadatas"].extend(metadatas)
+            if len(buffer["ids"]) >= flush_size:
+                flush(name)
+
+        # Chunks are embedded and written batch by batch into a new collection,
+        # which replaces the index only once it is complete; searches keep
+        # using the current index meanwhile and a failure leaves it untouched
+        with self.vector_store.rebuild() as name, ProcessPoolExecutor(
+            max_workers=settings.index_workers or None, initializer=_init_worker
+        ) as pool:
+            tasks = [(file_path, cache_only) for file_path in files]
+            results = pool.map(_chunk_file_task, tasks)
+            for result in tqdm(
+                results, total=len(files), desc="Re-indexing", disable=not progress
+            ):
+                if result["missing"]:
+                    # Never drop documents from the index because their pages
+                    # are not cached
+                    raise RuntimeError(
+                        f"{result['source']} is missing from the page cache"
+                    )
+                totals["cache_hits"] += result["cache_hit"]
+                totals["pages"] += result["pages"]
+                totals["chunks"] += len(result["ids"])
+                add(result["ids"], result["texts"], result["metadatas"], name)
+
+            # Summary nodes are kept, but re-embedded in case the model changed
+            summaries = self.vector_store.get_records(
+                where={"node_type": {"$in": SUMMARY_NODE_TYPES}}
+            )
+            for start in range(0, len(summaries["ids"]), flush_size):
+                end = start + flush_size
+                add(
+                    summaries["ids"][start:end],
+                    summaries["documents"][start:end],
+                    summaries["metadatas"][start:end],
+                    name,
+                )
+            flush(name)
+
+        total_seconds = time.time() - start_time
+        report = {
+            "files": len(files),
+            "cache_hits": totals["cache_hits"],
+            "pages": totals["pages"],
+            "chunks": totals["chunks"],
+            "summary_nodes": len(summaries["ids"]),
+            "embed_seconds": round(totals["embed_seconds"], 3),
+            "total_seconds": round(total_seconds, 3),
+            "pages_per_sec": _rate(totals["pages"], total_seconds),
+            "chunks_per_sec": _rate(
+                totals["chunks"] + len(summaries["ids"]), total_seconds
+            ),
+        }
+        logger.info(f"Re-index finished: {report}")
+        return report
+
+
+class BulkIngestor:
+    """Ingests a directory, glob or ZIP archive of PDFs into the vector index.
+
+    Files are parsed in worker processes. Chunks from all files share one
+    embedding buffer, so small documents still fill provider batches, and are
+    written in large upserts. A file is recorded in the ingest state only once
+    all of its chunks are stored, so an interrupted run resumes where it left
+    off. Chunk ids are deterministic, which makes re-writing a file idempotent
+    and lets a recorded file be checked against the index: one whose chunks
+    were deleted since is ingested again.
+    """
+
+    def __init__(
+        self,
+        vector_store,
+        upload_path: str = settings.pdf_upload_path,
+        state_path: str = settings.ingest_state_path,
+    ):
+        self.vector_store = vector_store
+        self.upload_path = upload_path
+        self.state_path = state_path
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"completed": {}}
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _is_stored(self, source: str, digest: str, entry: Dict[str, Any]) -> bool:
+        """Whether the chunks recorded for a file version are still in the index"""
+        prefix = chunk_id_prefix(source, digest)
+        ids = self.vector_store.get_records(where={"source": source})["ids"]
+        stored = sum(1 for record_id in ids if record_id.startswith(prefix))
+        # Entries written before chunk counts were recorded need any chunk
+        return stored >= entry.get("chunks", 1)
+
+    def _store(
+        self,
+        file_path: str,
+        name: str,
+        claimed: Dict[str, str],
+        renamed: List[Dict[str, str]],
+        move: bool = False,
+    ) -> Tuple[str, str]:
+        """Place a PDF in the upload directory, like an HTTP upload would.
+
+        Files of one run that share a name but not their contents would
+        overwrite each other there; later ones are stored under the name
+        suffixed with their hash instead, and reported. Returns the stored
+        path and the file hash.
+        """
+        from services.page_cache import file_hash
+
+        digest = file_hash(file_path)
+        stored_name = name
+        if claimed.get(name, digest) != digest:
+            stem, extension = os.path.splitext(name)
+            stored_name = f"{stem}-{digest[:8]}{extension}"
+            renamed.append({"file": file_path, "stored_as": stored_name})
+            logger.warning(
+                f"{file_path} has the same name as another file, "
+                f"storing it as {stored_name}"
+            )
+        claimed.setdefault(name, digest)
+        claimed[stored_name] = digest
+
+        destination = os.path.join(self.upload_path, stored_name)
+        if move:
+            os.replace(file_path, destination)
+        elif os.path.abspath(file_path) != os.path.abspath(destination):
+            shutil.copyfile(file_path, destination)
+        return destination, digest
+
+    def collect_files(
+        self, inputs: List[str]
+    ) -> Tuple[Dict[str, str], List[Dict[str, str]]]:
+        """Resolve directories, globs and ZIP archives to PDFs in the upload directory.
+
+        Returns the stored paths with their file hashes, and the files that
+        were stored under a different name because their name was taken.
+        """
+        os.makedirs(self.upload_path, exist_ok=True)
+
+        files: Dict[str, str] = {}
+        claimed: Dict[str, str] = {}
+        renamed: List[Dict[str, str]] = []
+        for item in inputs:
+            if os.path.isdir(item):
+                matches = glob.glob(os.path.join(item, "**", "*"), recursive=True)
+            elif zipfile.is_zipfile(item):
+                with zipfile.ZipFile(item) as archive:
+                    for member in archive.infolist():
+                        filename = os.path.basename(member.filename)
+                        if member.is_dir() or not filename.lower().endswith(".pdf"):
+                            continue
+                        part_path = os.path.join(self.upload_path, f".{filename}.part")
+                        with archive.open(member) as source, open(
+                            part_path, "wb"
+                        ) as target:
+                            shutil.copyfileobj(source, target)
+                        path, digest = self._store(
+                            part_path, filename, claimed, renamed, move=True
+                        )
+                        files[path] = digest
+                continue
+            else:
+                matches = glob.glob(item, recursive=True)
+
+            # The same file may be matched by several inputs
+            for match in sorted(matches):
+                if os.path.isfile(match) and match.lower().endswith(".pdf"):
+                    path, digest = self._store(
+                        match, os.path.basename(match), claimed, renamed
+                    )
+                    files[path] = digest
+
+        return files, renamed
+
+    def run(
+        self, inputs: List[str], force: bool = False, progress: bool = True
+    ) -> Dict[str, Any]:
+        from tqdm import tqdm
+
+        start_time = time.time()
+        files, renamed = self.collect_files(inputs)
+        state = self._load_state()
+        completed = state["completed"]
+
+        pending_files = []
+        skipped = 0
+        for file_path, digest in files.items():
+            source = os.path.basename(file_path)
+            key = f"{source}:{digest}"
+            if (
+                not force
+                and key in completed
+                and self._is_stored(source, digest, completed[key])
+            ):
+                skipped += 1
+            else:
+                pending_files.append(file_path)
+
+        buffer: Dict[str, List] = {"ids": [], "texts": [], "metadatas": [], "keys": []}
+        remaining: Dict[str, int] = {}
+        chunk_counts: Dict[str, int] = {}
+        totals = {"pages": 0, "chunks": 0, "embed_seconds": 0.0}
+        failed = []
+
+        def mark_completed(key: str) -> None:
+            completed[key] = {
+                "completed_at": datetime.now().isoformat(),
+                "chunks": chunk_counts.pop(key),
+            }
+            self._save_state(state)
+
+        def flush() -> None:
+            if not buffer["ids"]:
+                return
+            embed_start = time.time()
+            vectors = embed_in_batches(self.vector_store.embeddings, buffer["texts"])
+            self.vector_store.upsert_embeddings(
+                buffer["ids"], vectors, buffer["texts"], buffer["metadatas"]
+            )
+            totals["embed_seconds"] += time.time() - embed_start
+            totals["chunks"] += len(buffer["ids"])
+
+            for key in buffer["keys"]:
+                remaining[key] -= 1
+                if remaining[key] == 0:
+                    mark_completed(key)
+            for values in buffer.values():
+                values.clear()
+
+        flush_size = settings.embedding_batch_size * settings.embedding_max_workers
+
+        with ProcessPoolExecutor(
+            max_workers=settings.index_workers or None, initializer=_init_worker
+        ) as pool, tqdm(
+            total=len(pending_files), desc="Ingesting", unit="file", disable=not progress
+        ) as progress_bar:
+            futures = {
+                pool.submit(chunk_file, file_path): file_path
+                for file_path in pending_files
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Error processing {futures[future]}: {str(e)}")
+                    failed.append(os.path.basename(futures[future]))
+                    progress_bar.update(1)
+                    continue
+
+                key = f"{result['source']}:{result['digest']}"
+                totals["pages"] += result["pages"]
+
+                # Drop chunks left by an earlier upload of the same file; its
+                # summary nodes are kept, bulk ingestion does not summarize
+                self.vector_store.delete_document(
+                    result["source"], chunks_only=True
+                )
+
+                remaining[key] = chunk_counts[key] = len(result["ids"])
+                if not result["ids"]:
+                    mark_completed(key)
+
+                buffer["ids"].extend(result["ids"])
+                buffer["texts"].extend(result["texts"])
+                buffer["metadatas"].extend(result["metadatas"])
+                buffer["keys"].extend([key] * len(result["ids"]))
+                if len(buffer["ids"]) >= flush_size:
+                    flush()
+
+                progress_bar.update(1)
+                progress_bar.set_postfix(chunks=totals["chunks"] + len(buffer["ids"]))
+
+            flush()
+
+        total_seconds = time.time() - start_time
+        report = {
+            "files": len(files),
+            "ingested": len(pending_files) - len(failed),
+            "skipped": skipped,
+            "failed": failed,
+            "renamed": renamed,
+            "pages": totals["pages"],
+            "chunks": totals["chunks"],
+            "embed_seconds": round(totals["embed_seconds"], 3),
+            "total_seconds": round(total_seconds, 3),
+            "files_per_sec": _rate(len(pending_files) - len(failed), total_seconds),
+            "pages_per_sec": _rate(totals["pages"], total_seconds),
+            "chunks_per_sec": _rate(totals["chunks"], total_seconds),
+        }
+        logger.info(f"Bulk ingestion finished: {report}")
+        return report
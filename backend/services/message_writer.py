@@ -0,0 +1,201 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from config import settings
+from db import Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def utc_now() -> datetime:
+    """Naive UTC timestamp, matching SQLite's CURRENT_TIMESTAMP"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class MessageWriter:
+    """Write-behind persistence for conversations and messages.
+
+    Writes are queued and committed by one background thread in batches.
+    The queue is FIFO and the thread writes each batch in one transaction,
+    so rows land in the order they were queued, e.g. a conversation before its
+    first message and a question before its answer. When a batch keeps
+    failing, its writes are retried one by one and the ones that still fail
+    are appended to a dead-letter file instead of being dropped.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        batch_size: int = settings.message_write_batch_size,
+        flush_interval: float = settings.message_flush_interval_ms / 1000,
+        max_retries: int = 3,
+        dead_letter_path: str = settings.message_dead_letter_path,
+    ):
+        self.session_factory = session_factory
+        self.dead_letter_path = dead_letter_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+
+        self._queue: queue.Queue = queue.Queue()
+        self._pending: Dict[str, int] = {}
+        self._pending_lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name="message-writer", daemon=True
+        )
+        self._thread.start()
+
+    def add_conversation(self, token: str, name: str) -> None:
+        self._queue.put(("conversation", {"token": token, "name": name}))
+
+    def rename_conversation(self, token: str, name: str) -> None:
+        self._queue.put(("conversation_name", {"token": token, "name": name}))
+
+    def add_message(
+        self, token: str, role: str, content: str, created_at: Optional[datetime] = None
+    ) -> None:
+        with self._pending_lock:
+            self._pending[token] = self._pending.get(token, 0) + 1
+        self._queue.put(
+            (
+                "message",
+                {
+                    "conversation_token": token,
+                    "role": role,
+                    "content": content,
+                    "created_at": created_at or utc_now(),
+                },
+            )
+        )
+
+    def pending_messages(self, token: str) -> int:
+        """Messages of a conversation queued but not yet committed"""
+        with self._pending_lock:
+            return self._pending.get(token, 0)
+
+    def _done(self, items: List) -> None:
+        with self._pending_lock:
+            for kind, row in items:
+                if kind != "message":
+                    continue
+                token = row["conversation_token"]
+                self._pending[token] -= 1
+                if not self._pending[token]:
+                    del self._pending[token]
+
+    def flush(self) -> None:
+        """Block until every queued write is committed (or given up on)"""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Flush pending writes and stop the writer thread"""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _next_batch(self) -> List:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and batch[-1] is not _STOP:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, items: List) -> None:
+        session = self.session_factory()
+        try:
+            # Consecutive writes of the same kind go out as one executemany
+            index = 0
+            while index < len(items):
+                kind = items[index][0]
+                rows = []
+                while index < len(items) and items[index][0] == kind:
+                    rows.append(items[index][1])
+                    index += 1
+
+                if kind == "conversation":
+                    statement = sqlite_insert(Conversation).on_conflict_do_nothing()
+                elif kind == "conversation_name":
+                    for row in rows:
+                        session.execute(
+                            update(Conversation)
+                            .where(Conversation.token == row["token"])
+                            .values(name=row["name"])
+                        )
+                    continue
+                else:
+                    statement = insert(Message)
+                session.execute(statement, rows)
+            session.commit()
+        except SQLAlchemyError:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _write_with_retries(self, items: List) -> bool:
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                self._write(items)
+                return True
+            except Exception as e:
+                logger.error(
+                    f"Error persisting {len(items)} chat writes "
+                    f"(attempt {attempt}/{self.max_retries}): {str(e)}"
+                )
+                if attempt < self.max_retries:
+                    time.sleep(0.1 * 2**attempt)
+        return False
+
+    def _dead_letter(self, item) -> None:
+        kind, row = item
+        record = {"kind": kind, **row}
+        if isinstance(record.get("created_at"), datetime):
+            record["created_at"] = record["created_at"].isoformat()
+
+        logger.error(f"Moving chat write to {self.dead_letter_path}: {record}")
+        try:
+            directory = os.path.dirname(self.dead_letter_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.dead_letter_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            logger.error(f"Error writing dead letter {record}: {str(e)}")
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            stop = batch[-1] is _STOP
+            items = batch[:-1] if stop else batch
+
+            if items and not self._write_with_retries(items):
+                # Isolate the failing writes so the rest of the batch still lands
+                for item in items:
+                    try:
+                        self._write([item])
+                    except Exception as e:
+                        logger.error(f"Error persisting chat write: {str(e)}")
+                        self._dead_letter(item)
+            self._done(items)
+
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
@@ -0,0 +1,104 @@
+from typing import List, Tuple
+
+import numpy as np
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Scale each row to unit length, so dot products are cosine similarities"""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[np.newaxis, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def gap_cut(scores, min_k: int, max_k: int, min_gap: float) -> int:
+    """How many leading scores to keep, cutting at the largest drop.
+
+    ``scores`` are taken in the given order and cut at the largest drop
+    between neighbours within ``[min_k, max_k]``. When no drop is larger than
+    ``min_gap`` the scores form a plateau and ``max_k`` is kept.
+    """
+    scores = np.asarray(scores)
+    count = len(scores)
+    if count <= min_k:
+        return count
+
+    max_k = min(max_k, count)
+    ranked = scores[: max_k + 1]
+    gaps = ranked[:-1] - ranked[1:]
+
+    # gaps[i] is the drop after keeping i + 1 scores
+    window = gaps[min_k - 1 : max_k]
+    if len(window) == 0:
+        return max_k
+    position = int(np.argmax(window))
+    if window[position] < min_gap:
+        return max_k
+    return min_k + position
+
+
+def adaptive_k(relevance: np.ndarray, min_k: int, max_k: int, min_gap: float) -> int:
+    """Pick how many candidates to keep from the drop-offs in their relevance.
+
+    Candidates are ranked by relevance and cut with ``gap_cut``.
+    """
+    return gap_cut(np.sort(relevance)[::-1], min_k, max_k, min_gap)
+
+
+def mmr_select(
+    query_embedding, candidate_embeddings, k: int, lambda_mult: float
+) -> Tuple[List[int], np.ndarray]:
+    """Select ``k`` candidates by maximal marginal relevance.
+
+    Returns the selected candidate indices in selection order together with the
+    relevance (cosine similarity to the query) of every candidate. Each greedy
+    step costs one matrix-vector product against the last selected candidate
+    and an update of the running "closest selected" vector; the full pairwise
+    matrix is never built.
+    """
+    candidates = normalize_rows(candidate_embeddings)
+    query = normalize_rows(query_embedding)[0]
+
+    relevance = candidates @ query
+    count = len(candidates)
+    k = min(k, count)
+    if k <= 0:
+        return [], relevance
+
+    closest_selected = np.full(count, -np.inf, dtype=np.float32)
+    available = np.ones(count, dtype=bool)
+
+    selected = [int(np.argmax(relevance))]
+    available[selected[0]] = False
+    for _ in range(1, k):
+        np.maximum(
+            closest_selected, candidates @ candidates[selected[-1]], out=closest_selected
+        )
+        scores = lambda_mult * relevance - (1 - lambda_mult) * closest_selected
+        scores[~available] = -np.inf
+        index = int(np.argmax(scores))
+        selected.append(index)
+        available[index] = False
+
+    return selected, relevance
+
+
+def trim_to_relevant(
+    selected: List[int],
+    relevance: np.ndarray,
+    min_k: int,
+    max_k: int,
+    min_gap: float,
+) -> List[int]:
+    """Truncate MMR picks at the largest relevance drop along the selection order.
+
+    The cut is found on the relevance of the picks in the order MMR chose
+    them, so the diverse picks before it are kept as they are; candidates
+    MMR skipped as redundant are never brought back.
+    """
+    if not selected:
+        return []
+    k = gap_cut(relevance[selected], min_k, max_k, min_gap)
+    return list(selected[:k])
@@ -0,0 +1,65 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+from typing import List, Dict, Any, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the extracted page format or extraction logic changes,
+# so stale cache entries are ignored instead of being re-chunked.
+EXTRACTOR_VERSION = "pdfplumber-1"
+
+
+def file_hash(file_path: str) -> str:
+    """SHA-256 of the file contents"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PageCache:
+    """Extracted per-page PDF content, keyed by file hash and extractor version"""
+
+    def __init__(self, cache_path: str = settings.page_cache_path):
+        self.cache_path = cache_path
+        os.makedirs(self.cache_path, exist_ok=True)
+
+    @property
+    def version(self) -> str:
+        tables = "tables" if settings.extract_tables else "text"
+        return f"{EXTRACTOR_VERSION}-{tables}"
+
+    def _entry_path(self, digest: str) -> str:
+        return os.path.join(self.cache_path, f"{digest}-{self.version}.json.gz")
+
+    def get(self, digest: str) -> Optional[List[Dict[str, Any]]]:
+        try:
+            with gzip.open(self._entry_path(digest), "rt", encoding="utf-8") as f:
+                return json.load(f)["pages"]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Ignoring corrupt page cache entry {digest}: {str(e)}")
+            return None
+
+    def put(self, digest: str, pages: List[Dict[str, Any]]) -> None:
+        path = self._entry_path(digest)
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(
+                {"version": self.version, "pages": pages}, f, separators=(",", ":")
+            )
+        os.replace(tmp_path, path)
+
+    def delete(self, digest: str) -> bool:
+        try:
+            os.unlink(self._entry_path(digest))
+            return True
+        except FileNotFoundError:
+            return False
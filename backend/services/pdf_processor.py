@@ -1,17 +1,22 @@
+from __future__ import annotations
+
 import os
-from typing import List, Dict, Any
-import pdfplumber
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document
+from typing import List, Dict, Any, TYPE_CHECKING
 from config import settings
 import logging
 
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
 logger = logging.getLogger(__name__)
 
 
 class PDFProcessor:
-    def __init__(self):
+    def __init__(self, page_cache=None):
         """Initialize text splitter with chunk size and overlap settings"""
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        self.page_cache = page_cache
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=settings.chunk_size,
             chunk_overlap=settings.chunk_overlap,
@@ -19,24 +24,60 @@ class PDFProcessor:
             separators=["\n\n", "\n", " ", ""],
         )
 
+    def _extract_pages(self, file_path: str) -> List[Dict[str, Any]]:
+        """Run pdfplumber over every page, keeping text, tables and page layout"""
+        import pdfplumber
+
+        pages = []
+        with pdfplumber.open(file_path) as pdf:
+            for page_num, page in enumerate(pdf.pages, 1):
+                text = page.extract_text()
+                if text:
+                    page_data = {
+                        "page_number": page_num,
+                        "content": text,
+                        "layout": {
+                            "width": float(page.width),
+                            "height": float(page.height),
+                        },
+                    }
+                    if settings.extract_tables:
+                        page_data["tables"] = page.extract_tables()
+                    pages.append(page_data)
+        return pages
+
+    def load_pages(self, file_path: str, digest: str = None) -> List[Dict[str, Any]]:
+        """Get extracted pages from the page cache, extracting them on a miss"""
+        if self.page_cache is None:
+            return self._extract_pages(file_path)
+
+        from services.page_cache import file_hash
+
+        digest = digest or file_hash(file_path)
+        pages = self.page_cache.get(digest)
+        if pages is None:
+            pages = self._extract_pages(file_path)
+            self.page_cache.put(digest, pages)
+        else:
+            logger.debug(f"Page cache hit for {file_path}")
+        return pages
+
+    def forget_pages(self, file_path: str) -> bool:
+        """Drop the cached pages of a file"""
+        if self.page_cache is None or not os.path.isfile(file_path):
+            return False
+
+        from services.page_cache import file_hash
+
+        return self.page_cache.delete(file_hash(file_path))
+
     def extract_text_from_pdf(self, file_path: str) -> List[Dict[str, Any]]:
         """Extract text from PDF and return page-wise content"""
         try:
-            pages_content = []
-            with pdfplumber.open(file_path) as pdf:
-                for page_num, page in enumerate(pdf.pages, 1):
-                    text = page.extract_text()
-                    if text:
-                        pages_content.append(
-                            {
-                                "page_number": page_num,
-                                "content": text,
-                                "metadata": {
-                                    "source": os.path.basename(file_path),
-                                    "page": page_num,
-                                },
-                            }
-                        )
+            source = os.path.basename(file_path)
+            pages_content = self.load_pages(file_path)
+            for page in pages_content:
+                page["metadata"] = {"source": source, "page": page["page_number"]}
             return pages_content
         except Exception as e:
             logger.error(f"Error extracting text from PDF: {str(e)}")
@@ -44,6 +85,8 @@ class PDFProcessor:
 
     def split_into_chunks(self, pages_content: List[Dict[str, Any]]) -> List[Document]:
         """Split page content into chunks"""
+        from langchain_core.documents import Document
+
         try:
             documents = []
             for page in pages_content:
@@ -54,6 +97,7 @@ class PDFProcessor:
                         metadata={
                             "source": page["metadata"]["source"],
                             "page": page["metadata"]["page"],
+                            "node_type": "chunk",
                         },
                     )
                     documents.append(doc)
@@ -0,0 +1,364 @@
+import asyncio
+import contextvars
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Request, Response
+
+from config import settings
+
+# Microseconds keep ids of the same second in creation order; ids written
+# before they were added have none and sort first within their second
+PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{6}(?:[0-9]{6})?-[0-9a-f]{8}$")
+
+# Stage tags are only recorded while a profile is running; otherwise
+# stage() and to_thread() reduce to one global check.
+_active: Optional["Profile"] = None
+_current: contextvars.ContextVar = contextvars.ContextVar("profile", default=None)
+_stage: contextvars.ContextVar = contextvars.ContextVar("profile_stage", default=None)
+_NO_STAGE = nullcontext()
+
+
+class Profile:
+    """Sampling CPU profile and allocation snapshot of one request.
+
+    A sampler thread walks the stacks of the threads working on the request
+    every few milliseconds and counts them as folded stacks (the input format
+    of flamegraph.pl and speedscope), rooted at the request stage the thread
+    was in.
+
+    Each stage is anchored to the frame that entered it, and a thread is only
+    sampled while that frame is on its stack. An event-loop thread whose
+    stage is awaiting, and is running other coroutines or waiting in
+    ``select``, is not counted against the request.
+    """
+
+    def __init__(
+        self, path: str, interval: float = settings.profile_interval_ms / 1000
+    ):
+        now = datetime.now(timezone.utc)
+        self.id = f"{now.strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+        self.path = path
+        self.started_at = now.isoformat()
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.stages: List[Dict[str, Any]] = []
+        self.allocations: List[Dict[str, Any]] = []
+        self.memory: Dict[str, int] = {}
+        self.duration_ms = 0.0
+
+        self._threads: Dict[int, List[Tuple[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(
+            target=self._sample, name="profile-sampler", daemon=True
+        )
+        self._owns_tracemalloc = False
+        self._start = 0.0
+
+    def start(self) -> None:
+        self._start = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(settings.profile_traceback_frames)
+            self._owns_tracemalloc = True
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._sampler.join()
+        self.duration_ms = round((time.perf_counter() - self._start) * 1000, 2)
+
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, __file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                ]
+            )
+            current, peak = tracemalloc.get_traced_memory()
+            self.memory = {"traced_current_bytes": current, "traced_peak_bytes": peak}
+            self.allocations = [
+                {
+                    "location": str(statistic.traceback[0]),
+                    "size_bytes": statistic.size,
+                    "count": statistic.count,
+                }
+                for statistic in snapshot.statistics("lineno")[
+                    : settings.profile_top_allocations
+                ]
+            ]
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+
+        try:
+            import resource
+
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            self.memory["max_rss_kb"] = usage.ru_maxrss
+        except ImportError:
+            pass
+
+    def enter_stage(self, name: str, anchor) -> float:
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._threads.setdefault(thread_id, []).append((name, anchor))
+        return time.perf_counter()
+
+    def exit_stage(self, name: str, start: float) -> None:
+        end = time.perf_counter()
+        thread_id = threading.get_ident()
+        with self._lock:
+            stages = self._threads.get(thread_id, [])
+            names = [stage_name for stage_name, _ in stages]
+            if name in names:
+                # Concurrent stages on the event loop do not exit in LIFO order
+                del stages[len(names) - 1 - names[::-1].index(name)]
+            if not stages:
+                self._threads.pop(thread_id, None)
+            self.stages.append(
+                {
+                    "name": name,
+                    "thread": threading.current_thread().name,
+                    "start_ms": round((start - self._start) * 1000, 2),
+                    "duration_ms": round((end - start) * 1000, 2),
+                }
+            )
+
+    def _sample(self) -> None:
+        deadline = time.monotonic() + settings.profile_max_duration_s
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            with self._lock:
+                threads = {
+                    thread_id: list(stages)
+                    for thread_id, stages in self._threads.items()
+                    if stages
+                }
+            frames = sys._current_frames()
+            for thread_id, stages in threads.items():
+                frame = frames.get(thread_id)
+                stage = self._running_stage(stages, frame)
+                if stage is not None:
+                    self.samples[self._fold(stage, frame)] += 1
+
+    @staticmethod
+    def _running_stage(stages: List[Tuple[str, Any]], frame) -> Optional[str]:
+        """Innermost stage whose anchor frame is on the stack, if any"""
+        on_stack = set()
+        while frame is not None:
+            on_stack.add(id(frame))
+            frame = frame.f_back
+        for name, anchor in reversed(stages):
+            if id(anchor) in on_stack:
+                return name
+        return None
+
+    @staticmethod
+    def _fold(stage: str, frame) -> str:
+        stack = []
+        while frame is not None and len(stack) < settings.profile_max_depth:
+            code = frame.f_code
+            filename = os.path.basename(code.co_filename)
+            stack.append(f"{code.co_name} ({filename}:{frame.f_lineno})")
+            frame = frame.f_back
+        stack.append(stage)
+        return ";".join(reversed(stack))
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.items())
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "sample_count": sum(self.samples.values()),
+            "interval_ms": self.interval * 1000,
+            "stages": self.stages,
+            "memory": self.memory,
+            "allocations": self.allocations,
+        }
+
+
+class ProfileStore:
+    """On-disk ring buffer of the most recent profiles"""
+
+    def __init__(
+        self,
+        profile_dir: str = settings.profile_dir,
+        max_entries: int = settings.profile_max_entries,
+    ):
+        self.profile_dir = profile_dir
+        self.max_entries = max_entries
+
+    def _path(self, profile_id: str, extension: str) -> str:
+        if not PROFILE_ID.match(profile_id):
+            raise FileNotFoundError(f"Profile {profile_id} not found")
+        path = os.path.join(self.profile_dir, f"{profile_id}.{extension}")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Profile {profile_id} not found")
+        return path
+
+    def _ids(self) -> List[str]:
+        if not os.path.isdir(self.profile_dir):
+            return []
+        # Ids start with their UTC timestamp, so they sort oldest first
+        return sorted(
+            name[: -len(".json")]
+            for name in os.listdir(self.profile_dir)
+            if name.endswith(".json") and PROFILE_ID.match(name[: -len(".json")])
+        )
+
+    def save(self, profile: Profile) -> None:
+        os.makedirs(self.profile_dir, exist_ok=True)
+        base = os.path.join(self.profile_dir, profile.id)
+        with open(f"{base}.folded", "w") as f:
+            f.write(profile.folded())
+        # The summary is written last; it is what marks a profile as complete
+        with open(f"{base}.json.tmp", "w") as f:
+            json.dump(profile.summary(), f)
+        os.replace(f"{base}.json.tmp", f"{base}.json")
+
+        for profile_id in self._ids()[: -self.max_entries]:
+            base = os.path.join(self.profile_dir, profile_id)
+            for extension in ("json", "folded"):
+                try:
+                    os.remove(f"{base}.{extension}")
+                except FileNotFoundError:
+                    pass
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """Profile summaries without allocations, newest first"""
+        profiles = []
+        for profile_id in reversed(self._ids()):
+            summary = self.load(profile_id)
+            summary.pop("allocations", None)
+            profiles.append(summary)
+        return profiles
+
+    def load(self, profile_id: str) -> Dict[str, Any]:
+        with open(self._path(profile_id, "json")) as f:
+            return json.load(f)
+
+    def flamegraph_path(self, profile_id: str) -> str:
+        self._path(profile_id, "json")
+        return self._path(profile_id, "folded")
+
+
+class Profiler:
+    """Decides which requests are profiled and runs one profile at a time"""
+
+    def __init__(self, store: Optional[ProfileStore] = None):
+        self.store = store or ProfileStore()
+        self._armed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def arm(self, path: str, count: int = 1) -> Dict[str, int]:
+        """Profile the next ``count`` requests to ``path``"""
+        with self._lock:
+            self._armed[path] = self._armed.get(path, 0) + count
+            return dict(self._armed)
+
+    def begin(self, path: str, requested: bool) -> Optional[Profile]:
+        global _active
+
+        with self._lock:
+            if not requested and not self._armed.get(path):
+                return None
+            if _active is not None:
+                # The sampler sees every thread; keep profiles from overlapping
+                return None
+            if not requested:
+                self._armed[path] -= 1
+                if not self._armed[path]:
+                    del self._armed[path]
+            profile = Profile(path)
+            _active = profile
+
+        profile.start()
+        return profile
+
+    def end(self, profile: Profile) -> None:
+        global _active
+
+        try:
+            profile.stop()
+            self.store.save(profile)
+        finally:
+            with self._lock:
+                _active = None
+
+
+profiler = Profiler()
+
+
+def _request_profile() -> Optional[Profile]:
+    profile = _current.get()
+    return profile if profile is not None and profile is _active else None
+
+
+@contextmanager
+def _profiled_stage(profile: Profile, name: str, anchor):
+    start = profile.enter_stage(name, anchor)
+    token = _stage.set(name)
+    try:
+        yield
+    finally:
+        _stage.reset(token)
+        profile.exit_stage(name, start)
+
+
+def stage(name: str):
+    """Tag the enclosed code with a request stage while it is being profiled"""
+    if _active is None:
+        return _NO_STAGE
+    profile = _request_profile()
+    if profile is None:
+        return _NO_STAGE
+    # Anchored to the caller's frame, which is only on the stack while the
+    # caller runs, not while it awaits
+    return _profiled_stage(profile, name, sys._getframe(1))
+
+
+async def to_thread(func, *args, **kwargs):
+    """asyncio.to_thread that keeps the caller's stage tag in the worker thread"""
+    if _active is None or _request_profile() is None or _stage.get() is None:
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    def run():
+        with _profiled_stage(_request_profile(), _stage.get(), sys._getframe()):
+            return func(*args, **kwargs)
+
+    return await asyncio.to_thread(run)
+
+
+async def profile_request(request: Request, response: Response):
+    """Dependency profiling the request when asked by header or by arming"""
+    if not settings.profiling_enabled:
+        yield None
+        return
+
+    requested = request.headers.get("X-Profile", "").lower() in ("1", "true")
+    profile = profiler.begin(request.url.path, requested)
+    if profile is None:
+        yield None
+        return
+
+    # Set in the request task, so the route and its stages see it
+    _current.set(profile)
+    response.headers["X-Profile-Id"] = profile.id
+    try:
+        yield profile
+    finally:
+        await asyncio.to_thread(profiler.end, profile)
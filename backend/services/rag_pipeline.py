@@ -1,16 +1,17 @@
-from typing import List, Dict, Any, Tuple
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.schema import Document, HumanMessage, AIMessage, BaseMessage
-from dotenv import load_dotenv
+from __future__ import annotations
+
+from typing import List, Dict, Any, Tuple, Optional, TYPE_CHECKING
 
 from models.schemas import MessageSchema
 from config import settings
+from services.document_summarizer import SUMMARY_NODE_TYPES, is_broad_question
 
 import logging
 import time
 
-load_dotenv()
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+    from langchain_core.messages import BaseMessage
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +19,9 @@ logger = logging.getLogger(__name__)
 class RAGPipeline:
     def __init__(self, vector_store):
         """Initialize RAG pipeline components"""
+        from langchain_openai import ChatOpenAI
+        from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
         self.vector_store = vector_store
         self.llm = ChatOpenAI(
             openai_api_key=settings.openai_api_key,
@@ -53,14 +57,82 @@ class RAGPipeline:
             ]
         )
 
-    def _retrieve_documents(self, question: str) -> List[Tuple[Document, float]]:
+        self.rewrite_llm = ChatOpenAI(
+            openai_api_key=settings.openai_api_key,
+            model=settings.llm_model,
+            temperature=0,
+            max_tokens=100,
+        )
+
+        self.rewrite_prompt = ChatPromptTemplate.from_messages(
+            [
+                (
+                    "system",
+                    """
+                    Rewrite the user's latest question as a standalone question about financial documents,
+                    resolving references to the conversation. Return only the question.
+                    """.strip(),
+                ),
+                MessagesPlaceholder(variable_name="chat_history"),
+                ("user", "{question}"),
+            ]
+        )
+
+    def embed_query(self, question: str) -> List[float]:
+        """Embed the question for retrieval"""
+        return self.vector_store.embeddings.embed_query(question)
+
+    def _search(
+        self, question: str, embedding: Optional[List[float]], filter=None
+    ) -> List[Tuple[Document, float]]:
+        if settings.retrieval_mode == "mmr":
+            if embedding is None:
+                embedding = self.embed_query(question)
+            return self.vector_store.mmr_search_by_vector(embedding, filter=filter)
+        if embedding is None:
+            return self.vector_store.similarity_search(question, filter=filter)
+        return self.vector_store.similarity_search_by_vector(embedding, filter=filter)
+
+    def _retrieve_documents(
+        self, question: str, embedding: Optional[List[float]] = None
+    ) -> List[Tuple[Document, float]]:
         """Retrieve relevant documents for the question with their similarity scores"""
         try:
-            return self.vector_store.similarity_search(question)
+            # Broad questions are answered from precomputed summary nodes when available
+            if settings.summaries_enabled and is_broad_question(question):
+                summaries = self._search(
+                    question,
+                    embedding,
+                    filter={"node_type": {"$in": SUMMARY_NODE_TYPES}},
+                )
+                if summaries:
+                    return summaries
+
+            return self._search(question, embedding)
         except Exception as e:
             logger.error(f"Error retrieving documents: {str(e)}")
             raise
 
+    def retrieve(
+        self, question: str, embedding: Optional[List[float]] = None
+    ) -> List[Tuple[Document, float]]:
+        """Retrieve documents, using a precomputed question embedding if given"""
+        return self._retrieve_documents(question, embedding)
+
+    async def arewrite_question(
+        self, question: str, chat_history: List[MessageSchema] = None
+    ) -> Optional[str]:
+        """Rewrite a follow-up question into a standalone one, None if not needed"""
+        if not chat_history:
+            return None
+
+        prompt = self.rewrite_prompt.format_messages(
+            question=question, chat_history=self._build_chat_history(chat_history)
+        )
+        response = await self.rewrite_llm.ainvoke(prompt)
+        rewritten = response.content.strip()
+        return rewritten if rewritten and rewritten != question else None
+
     def _generate_context(self, documents: List[Tuple[Document, float]]) -> str:
         """Generate context from retrieved documents"""
         context_parts = []
@@ -95,6 +167,41 @@ class RAGPipeline:
             logger.error(f"Error generating LLM response: {str(e)}")
             raise
 
+    async def agenerate_llm_response(
+        self,
+        question: str,
+        documents_with_scores: List[Tuple[Document, float]],
+        chat_history: List[MessageSchema] = None,
+    ) -> str:
+        """Generate LLM response for already retrieved documents"""
+        try:
+            context = self._generate_context(documents_with_scores)
+            prompt = self.prompt.format_messages(
+                context=context,
+                question=question,
+                chat_history=self._build_chat_history(chat_history),
+            )
+            response = await self.llm.ainvoke(prompt)
+            return response.content
+        except Exception as e:
+            logger.error(f"Error generating LLM response: {str(e)}")
+            raise
+
+    @staticmethod
+    def build_sources(
+        documents_with_scores: List[Tuple[Document, float]],
+    ) -> List[Dict[str, Any]]:
+        """Convert retrieved documents to response sources"""
+        return [
+            {
+                "content": doc.page_content,
+                "page": doc.metadata.get("page", 0),
+                "score": float(score),
+                "metadata": doc.metadata,
+            }
+            for doc, score in documents_with_scores
+        ]
+
     def generate_answer(
         self, question: str, chat_history: List[MessageSchema] = None
     ) -> Dict[str, Any]:
@@ -108,15 +215,7 @@ class RAGPipeline:
 
             answer = self._generate_llm_response(question, context, chat_history)
 
-            sources = [
-                {
-                    "content": doc.page_content,
-                    "page": doc.metadata.get("page", 0),
-                    "score": float(score),
-                    "metadata": doc.metadata,
-                }
-                for doc, score in documents_with_scores
-            ]
+            sources = self.build_sources(documents_with_scores)
 
             processing_time = time.time() - start_time
 
@@ -134,8 +233,15 @@ class RAGPipeline:
         self, chat_history: List[MessageSchema]
     ) -> List[BaseMessage]:
         """Convert the list of MessageSchema to a list of LangChain Message objects"""
+        from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+
         converted_history = []
-        for message in chat_history:
+        for message in chat_history or []:
+            # History prebuilt by the conversation cache is already converted
+            if isinstance(message, BaseMessage):
+                converted_history.append(message)
+                continue
+
             role = message.role
             content = message.content
             if role == "user":
@@ -0,0 +1,388 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import uuid
+import zlib
+from array import array
+from datetime import datetime
+from typing import Any, Dict, List
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# File layout (all integers little-endian):
+#
+#   magic (8) | format version u32 | padding up to EMBEDDINGS_OFFSET
+#   embeddings: float32[count * dim], uncompressed so they can be memory-mapped
+#   records: zlib-compressed JSON (ids, texts, metadata, deletions, fingerprints)
+#   header: JSON | header length u64 | magic (8)
+MAGIC = b"FCBSNAP\0"
+FORMAT_VERSION = 1
+EMBEDDINGS_OFFSET = 64
+SNAPSHOT_SUFFIX = ".fcbsnap"
+STATE_FILENAME = ".snapshot_state.json"
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _fingerprint(text: str, metadata: Dict[str, Any]) -> str:
+    # The embedding model is part of the fingerprint, so re-embedding the index
+    # with another model marks every chunk as changed in the next delta
+    payload = json.dumps(
+        [text, metadata, settings.embedding_model], sort_keys=True, default=str
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _embeddings_to_bytes(embeddings) -> bytes:
+    if hasattr(embeddings, "astype"):
+        return embeddings.astype("<f4").tobytes()
+
+    buffer = array("f")
+    for row in embeddings:
+        buffer.extend(row)
+    return buffer.tobytes()
+
+
+def _build_registry(metadatas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    registry = {}
+    for metadata in metadatas:
+        source = (metadata or {}).get("source", "unknown")
+        entry = registry.setdefault(source, {"filename": source, "chunks_count": 0})
+        entry["chunks_count"] += 1
+    return list(registry.values())
+
+
+class Snapshot:
+    """A memory-mapped snapshot file.
+
+    Embeddings are read as float32 straight from the mapping without any
+    parsing; the compressed records are only decoded when first accessed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise SnapshotError(f"Snapshot file is empty: {path}")
+        self._records = None
+
+        try:
+            self.header = self._read_header()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_header(self) -> Dict[str, Any]:
+        size = len(self._mmap)
+        if sys.byteorder != "little":
+            raise SnapshotError("Snapshots can only be loaded on little-endian hosts")
+        if size < EMBEDDINGS_OFFSET + 16 or self._mmap[:8] != MAGIC:
+            raise SnapshotError(f"Not a snapshot file: {self.path}")
+        if self._mmap[size - 8 :] != MAGIC:
+            raise SnapshotError(f"Truncated snapshot file: {self.path}")
+
+        (version,) = struct.unpack_from("<I", self._mmap, 8)
+        if version != FORMAT_VERSION:
+            raise SnapshotError(
+                f"Unsupported snapshot format version {version}, expected {FORMAT_VERSION}"
+            )
+
+        (header_len,) = struct.unpack_from("<Q", self._mmap, size - 16)
+        header_start = size - 16 - header_len
+        return json.loads(self._mmap[header_start : size - 16].decode("utf-8"))
+
+    @property
+    def snapshot_id(self) -> str:
+        return self.header["snapshot_id"]
+
+    @property
+    def records(self) -> Dict[str, Any]:
+        if self._records is None:
+            start = self.header["records_offset"]
+            end = start + self.header["records_nbytes"]
+            self._records = json.loads(zlib.decompress(self._mmap[start:end]))
+        return self._records
+
+    def embedding_rows(self, start: int, end: int) -> List[List[float]]:
+        """Embeddings of records ``start:end``, read straight from the mapping."""
+        dim = self.header["dim"]
+        offset = self.header["embeddings_offset"] + start * dim * 4
+        with memoryview(self._mmap)[offset : offset + (end - start) * dim * 4] as raw:
+            with raw.cast("f") as flat:
+                values = flat.tolist()
+        return [values[i * dim : (i + 1) * dim] for i in range(end - start)]
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "snapshot_id": self.header["snapshot_id"],
+            "kind": self.header["kind"],
+            "base_snapshot_id": self.header.get("base_snapshot_id"),
+            "created_at": self.header["created_at"],
+            "embedding_model": self.header["embedding_model"],
+            "count": self.header["count"],
+            "deleted_count": self.header["deleted_count"],
+            "size_bytes": len(self._mmap),
+            "filename": os.path.basename(self.path),
+            "registry": self.header["registry"],
+        }
+
+    def close(self) -> None:
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SnapshotManager:
+    """Exports and imports versioned snapshots of the vector index."""
+
+    def __init__(self, vector_store, snapshot_path: str = settings.snapshot_path):
+        self.vector_store = vector_store
+        self.snapshot_path = snapshot_path
+        os.makedirs(self.snapshot_path, exist_ok=True)
+
+    def _snapshot_file(self, snapshot_id: str) -> str:
+        return os.path.join(self.snapshot_path, f"{snapshot_id}{SNAPSHOT_SUFFIX}")
+
+    def _state_file(self) -> str:
+        return os.path.join(settings.vector_db_path, STATE_FILENAME)
+
+    def _read_state(self) -> Dict[str, Any]:
+        try:
+            with open(self._state_file()) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_state(self, snapshot_id: str) -> None:
+        os.makedirs(settings.vector_db_path, exist_ok=True)
+        with open(self._state_file(), "w") as f:
+            json.dump(
+                {"snapshot_id": snapshot_id, "applied_at": datetime.now().isoformat()},
+                f,
+            )
+
+    def list_snapshots(self) -> List[Dict[str, Any]]:
+        """List snapshots on disk, newest first."""
+        snapshots = []
+        for filename in os.listdir(self.snapshot_path):
+            if not filename.endswith(SNAPSHOT_SUFFIX):
+                continue
+            try:
+                with Snapshot(os.path.join(self.snapshot_path, filename)) as snapshot:
+                    snapshots.append(snapshot.info())
+            except SnapshotError as e:
+                logger.error(f"Skipping invalid snapshot {filename}: {str(e)}")
+
+        snapshots.sort(key=lambda info: info["created_at"], reverse=True)
+        return snapshots
+
+    def get_path(self, snapshot_id: str) -> str:
+        path = self._snapshot_file(os.path.basename(snapshot_id))
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Snapshot not found: {snapshot_id}")
+        return path
+
+    def export(self, incremental: bool = False) -> Dict[str, Any]:
+        """Write a full snapshot, or a delta against the most recent snapshot.
+
+        Embeddings are read and written in batches, so only one batch of them
+        is held in memory.
+        """
+        with self.vector_store.write_lock:
+            return self._export(incremental)
+
+    def _export(self, incremental: bool) -> Dict[str, Any]:
+        results = self.vector_store.get_records()
+
+        ids = results["ids"] or []
+        texts = results["documents"] or []
+        metadatas = results["metadatas"] or []
+
+        fingerprints = {
+            id_: _fingerprint(text, metadata)
+            for id_, text, metadata in zip(ids, texts, metadatas)
+        }
+
+        kind = "full"
+        base_snapshot_id = None
+        deleted_ids: List[str] = []
+        selected_ids = ids
+
+        if incremental:
+            base = self.list_snapshots()
+            if base:
+                kind = "delta"
+                base_snapshot_id = base[0]["snapshot_id"]
+                with Snapshot(self.get_path(base_snapshot_id)) as base_snapshot:
+                    base_fingerprints = base_snapshot.records["fingerprints"]
+
+                selected_ids = [
+                    id_
+                    for id_ in ids
+                    if base_fingerprints.get(id_) != fingerprints[id_]
+                ]
+                deleted_ids = [id_ for id_ in base_fingerprints if id_ not in fingerprints]
+            else:
+                logger.info("No previous snapshot found, writing a full snapshot")
+
+        created_at = datetime.now()
+        snapshot_id = f"snapshot-{created_at.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        path = self._snapshot_file(snapshot_id)
+        tmp_path = f"{path}.tmp"
+        batch_size = settings.vector_db_batch_size
+        written = {"ids": [], "documents": [], "metadatas": []}
+        dim = 0
+        embeddings_nbytes = 0
+
+        with open(tmp_path, "wb") as f:
+            preamble = MAGIC + struct.pack("<I", FORMAT_VERSION)
+            f.write(preamble.ljust(EMBEDDINGS_OFFSET, b"\0"))
+            for start in range(0, len(selected_ids), batch_size):
+                # With a remote index the write lock is only local, so chunks
+                # deleted since the ids were listed are missing here; texts
+                # and metadata are taken from this read, like the embeddings
+                batch_ids = selected_ids[start : start + batch_size]
+                batch = self.vector_store.get_records(
+                    include_embeddings=True, ids=batch_ids
+                )
+                if batch["embeddings"] is None or not len(batch["ids"]):
+                    continue
+                dim = dim or len(batch["embeddings"][0])
+                embeddings_bytes = _embeddings_to_bytes(batch["embeddings"])
+                f.write(embeddings_bytes)
+                embeddings_nbytes += len(embeddings_bytes)
+                for key in written:
+                    written[key].extend(batch[key])
+
+            for id_, text, metadata in zip(
+                written["ids"], written["documents"], written["metadatas"]
+            ):
+                fingerprints[id_] = _fingerprint(text, metadata)
+            missing = set(selected_ids).difference(written["ids"])
+            if missing:
+                logger.info(f"{len(missing)} chunks were deleted during the export")
+                for id_ in missing:
+                    fingerprints.pop(id_, None)
+
+            records = zlib.compress(
+                json.dumps(
+                    {
+                        **written,
+                        "deleted_ids": deleted_ids,
+                        "fingerprints": fingerprints,
+                    },
+                    separators=(",", ":"),
+                ).encode("utf-8")
+            )
+            header = {
+                "format_version": FORMAT_VERSION,
+                "snapshot_id": snapshot_id,
+                "kind": kind,
+                "base_snapshot_id": base_snapshot_id,
+                "created_at": created_at.isoformat(),
+                "embedding_model": settings.embedding_model,
+                "dim": dim,
+                "count": len(written["ids"]),
+                "deleted_count": len(deleted_ids),
+                "total_count": len(ids) - len(missing),
+                "embeddings_offset": EMBEDDINGS_OFFSET,
+                "embeddings_nbytes": embeddings_nbytes,
+                "records_offset": EMBEDDINGS_OFFSET + embeddings_nbytes,
+                "records_nbytes": len(records),
+                "registry": _build_registry(
+                    [
+                        metadata
+                        for id_, metadata in zip(ids, metadatas)
+                        if id_ not in missing
+                    ]
+                ),
+            }
+            header_bytes = json.dumps(header).encode("utf-8")
+
+            f.write(records)
+            f.write(header_bytes)
+            f.write(struct.pack("<Q", len(header_bytes)))
+            f.write(MAGIC)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        logger.info(
+            f"Exported {kind} snapshot {snapshot_id}: {len(written['ids'])} chunks, "
+            f"{len(deleted_ids)} deletions"
+        )
+
+        with Snapshot(path) as snapshot:
+            return snapshot.info()
+
+    def import_snapshot(self, snapshot_id: str, force: bool = False) -> Dict[str, Any]:
+        """Load a snapshot into the vector store.
+
+        A full snapshot replaces the collection; a delta is applied on top of it
+        and requires its base snapshot to be the last one applied here.
+        """
+        with Snapshot(self.get_path(snapshot_id)) as snapshot:
+            header = snapshot.header
+            if header["embedding_model"] != settings.embedding_model and not force:
+                raise SnapshotError(
+                    f"Snapshot was built with {header['embedding_model']}, "
+                    f"but {settings.embedding_model} is configured"
+                )
+
+            if header["kind"] == "delta" and not force:
+                applied = self._read_state().get("snapshot_id")
+                if applied != header["base_snapshot_id"]:
+                    raise SnapshotError(
+                        f"Delta snapshot requires base {header['base_snapshot_id']}, "
+                        f"but the last applied snapshot is {applied}"
+                    )
+
+            records = snapshot.records
+            batch_size = settings.vector_db_batch_size
+
+            def batches():
+                for start in range(0, header["count"], batch_size):
+                    end = min(start + batch_size, header["count"])
+                    yield (
+                        records["ids"][start:end],
+                        snapshot.embedding_rows(start, end),
+                        records["documents"][start:end],
+                        records["metadatas"][start:end],
+                    )
+
+            if header["kind"] == "full":
+                # Loaded into a new collection that replaces the index once
+                # complete; searches never see a partial index
+                with self.vector_store.rebuild() as name:
+                    for ids, embeddings, texts, metadatas in batches():
+                        self.vector_store.upsert_rebuild(
+                            name, ids, embeddings, texts, metadatas
+                        )
+            else:
+                with self.vector_store.write_lock:
+                    if records["deleted_ids"]:
+                        self.vector_store.delete_ids(records["deleted_ids"])
+                    for ids, embeddings, texts, metadatas in batches():
+                        self.vector_store.upsert_embeddings(
+                            ids, embeddings, texts, metadatas
+                        )
+
+            self._write_state(header["snapshot_id"])
+            logger.info(f"Imported {header['kind']} snapshot {header['snapshot_id']}")
+            return snapshot.info()
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from services import profiling
+
+logger = logging.getLogger(__name__)
+
+_NO_DEFAULT = object()
+
+
+class TaskGraph:
+    """Small async dependency graph.
+
+    Each node is a coroutine function receiving the results of its
+    dependencies as keyword arguments. A node starts as soon as all its
+    dependencies finish, and per-node timings are recorded so the critical path
+    of a run can be inspected. A node with a timeout and a default returns the
+    default instead of failing when it runs out of time.
+    """
+
+    def __init__(self):
+        self._nodes: Dict[str, Dict[str, Any]] = {}
+        self.timings: Dict[str, Dict[str, Any]] = {}
+        self._start = 0.0
+
+    def add(
+        self,
+        name: str,
+        func: Callable[..., Awaitable[Any]],
+        deps: List[str] = (),
+        timeout: Optional[float] = None,
+        default: Any = _NO_DEFAULT,
+    ) -> None:
+        for dep in deps:
+            if dep not in self._nodes:
+                raise ValueError(f"Node {name} depends on unknown node {dep}")
+        self._nodes[name] = {
+            "func": func,
+            "deps": list(deps),
+            "timeout": timeout,
+            "default": default,
+        }
+
+    async def _run_node(self, name: str, tasks: Dict[str, asyncio.Task]) -> Any:
+        node = self._nodes[name]
+        results = {dep: await tasks[dep] for dep in node["deps"]}
+
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            with profiling.stage(name):
+                coroutine = node["func"](**results)
+                if node["timeout"] is None:
+                    return await coroutine
+                try:
+                    return await asyncio.wait_for(coroutine, node["timeout"])
+                except asyncio.TimeoutError:
+                    if node["default"] is _NO_DEFAULT:
+                        raise
+                    status = "timeout"
+                    return node["default"]
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            end = time.perf_counter()
+            self.timings[name] = {
+                "start_ms": round((start - self._start) * 1000, 2),
+                "duration_ms": round((end - start) * 1000, 2),
+                "end_ms": round((end - self._start) * 1000, 2),
+                "status": status,
+            }
+
+    async def run(self) -> Dict[str, Any]:
+        """Run every node and return their results by name"""
+        self._start = time.perf_counter()
+        self.timings = {}
+
+        tasks: Dict[str, asyncio.Task] = {}
+        for name in self._nodes:
+            tasks[name] = asyncio.ensure_future(self._run_node(name, tasks))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except Exception:
+            for task in tasks.values():
+                task.cancel()
+            raise
+
+        return {name: task.result() for name, task in tasks.items()}
+
+    def critical_path(self) -> List[str]:
+        """Chain of nodes that determined the total run time"""
+        if not self.timings:
+            return []
+
+        name = max(self.timings, key=lambda node: self.timings[node]["end_ms"])
+        path = [name]
+        while True:
+            deps = [dep for dep in self._nodes[name]["deps"] if dep in self.timings]
+            if not deps:
+                break
+            name = max(deps, key=lambda dep: self.timings[dep]["end_ms"])
+            path.append(name)
+        return list(reversed(path))
@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import itertools
+import logging
+import socket
+import threading
+from contextlib import contextmanager
+from typing import List, Tuple, Dict, Any, Optional, TYPE_CHECKING
+
+from config import settings
+from services.vector_protocol import (
+    HEADER,
+    STATUS_ERROR,
+    PING,
+    ADD_DOCUMENTS,
+    SEARCH,
+    DOCUMENT_INFO,
+    GET_CHUNKS,
+    CLEAR_ALL,
+    CLEAR,
+    GET_RECORDS,
+    UPSERT_EMBEDDINGS,
+    DELETE_IDS,
+    REPLACE_SUMMARY_NODES,
+    DELETE_DOCUMENT,
+    COMPACT,
+    SEARCH_VECTOR,
+    SEARCH_MMR,
+    REBUILD_BEGIN,
+    REBUILD_UPSERT,
+    REBUILD_FINISH,
+    REBUILD_ABORT,
+    ProtocolError,
+    decode_body,
+    encode_body,
+    encode_frame,
+)
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+
+class VectorStoreClient:
+    """VectorStore client mode: forwards every call to the vector index server.
+
+    Workers using it hold no index in memory. Each thread keeps its own
+    connection, so calls from the threadpool never share a socket.
+    """
+
+    def __init__(
+        self,
+        socket_path: str = settings.vector_socket_path,
+        timeout: float = settings.vector_client_timeout_s,
+    ):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._request_ids = itertools.count(1)
+        self._embeddings = None
+
+        # The server serializes writes; this lock only keeps the VectorStore API
+        self.write_lock = threading.RLock()
+
+    @property
+    def embeddings(self):
+        """Local embedding client, for callers that embed before upserting"""
+        if self._embeddings is None:
+            from langchain_openai import OpenAIEmbeddings
+
+            self._embeddings = OpenAIEmbeddings(
+                openai_api_key=settings.openai_api_key, model=settings.embedding_model
+            )
+        return self._embeddings
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # A timed out call closes the connection, so a late reply is never
+        # read as the reply to the next call
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self._local.sock = sock
+        return sock
+
+    def _close(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    @staticmethod
+    def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            count = sock.recv_into(view[received:])
+            if count == 0:
+                raise ConnectionError("Vector index server closed the connection")
+            received += count
+        return bytes(buffer)
+
+    def _call(self, opcode: int, payload: Dict[str, Any], vectors=None):
+        request_id = next(self._request_ids) % 2**32
+        frame = encode_frame(opcode, request_id, encode_body(payload, vectors))
+
+        sock = getattr(self._local, "sock", None)
+        try:
+            if sock is None:
+                sock = self._connect()
+            sock.sendall(frame)
+        except OSError:
+            # The cached connection may be stale (server restarted); retry once
+            self._close()
+            sock = self._connect()
+            sock.sendall(frame)
+
+        try:
+            length, status, response_id = HEADER.unpack(
+                self._recv_exactly(sock, HEADER.size)
+            )
+            body = self._recv_exactly(sock, length)
+        except OSError:
+            self._close()
+            raise
+
+        if response_id != request_id:
+            self._close()
+            raise ProtocolError(
+                f"Response id {response_id} does not match request id {request_id}"
+            )
+
+        result, result_vectors = decode_body(body)
+        if status == STATUS_ERROR:
+            raise RuntimeError(f"Vector index server error: {result['error']}")
+        return result, result_vectors
+
+    def ping(self) -> bool:
+        result, _ = self._call(PING, {})
+        return result["ok"]
+
+    def add_documents(self, documents: List[Document]) -> None:
+        """Add documents to the vector store."""
+        self._call(
+            ADD_DOCUMENTS,
+            {
+                "texts": [document.page_content for document in documents],
+                "metadatas": [document.metadata for document in documents],
+            },
+        )
+
+    def get_records(
+        self,
+        include_embeddings: bool = False,
+        where: Optional[Dict] = None,
+        ids: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Get ids, texts and metadata (and optionally embeddings) of stored chunks."""
+        result, vectors = self._call(
+            GET_RECORDS,
+            {"include_embeddings": include_embeddings, "where": where, "ids": ids},
+        )
+        result["embeddings"] = vectors if include_embeddings else None
+        return result
+
+    def upsert_embeddings(
+        self,
+        ids: List[str],
+        embeddings,
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+    ) -> None:
+        """Insert or replace chunks whose embeddings are already computed."""
+        batch_size = settings.vector_db_batch_size
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            self._call(
+                UPSERT_EMBEDDINGS,
+                {
+                    "ids": ids[start:end],
+                    "texts": texts[start:end],
+                    "metadatas": metadatas[start:end],
+                },
+                vectors=embeddings[start:end],
+            )
+
+    def delete_ids(self, ids: List[str]) -> None:
+        """Delete chunks by id."""
+        self._call(DELETE_IDS, {"ids": ids})
+
+    def replace_summary_nodes(self, source: str, nodes: List[Document]) -> None:
+        """Store summary nodes of a document as-is, replacing its previous ones."""
+        self._call(
+            REPLACE_SUMMARY_NODES,
+            {
+                "source": source,
+                "texts": [node.page_content for node in nodes],
+                "metadatas": [node.metadata for node in nodes],
+            },
+        )
+
+    def delete_document(self, source: str, chunks_only: bool = False) -> int:
+        """Delete every chunk and summary node of one source document.
+
+        With ``chunks_only`` the summary nodes are kept.
+        """
+        result, _ = self._call(
+            DELETE_DOCUMENT, {"source": source, "chunks_only": chunks_only}
+        )
+        return result["count"]
+
+    def maybe_compact(self) -> bool:
+        """Compact the index if the deletion threshold has been reached."""
+        result, _ = self._call(COMPACT, {"force": False})
+        return result["compacted"]
+
+    def compact(self) -> bool:
+        """Rebuild the index into a fresh collection and swap it in."""
+        result, _ = self._call(COMPACT, {"force": True})
+        return result["compacted"]
+
+    def begin_rebuild(self) -> str:
+        """Start building a replacement collection; returns its name."""
+        result, _ = self._call(REBUILD_BEGIN, {})
+        return result["name"]
+
+    def upsert_rebuild(
+        self,
+        name: str,
+        ids: List[str],
+        embeddings,
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+    ) -> None:
+        """Write chunks into the collection being rebuilt."""
+        batch_size = settings.vector_db_batch_size
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            self._call(
+                REBUILD_UPSERT,
+                {
+                    "name": name,
+                    "ids": ids[start:end],
+                    "texts": texts[start:end],
+                    "metadatas": metadatas[start:end],
+                },
+                vectors=embeddings[start:end],
+            )
+
+    def abort_rebuild(self, name: str) -> None:
+        """Drop the collection being rebuilt and keep the current one."""
+        self._call(REBUILD_ABORT, {"name": name})
+
+    def finish_rebuild(self, name: str) -> bool:
+        """Reconcile writes made during the rebuild and swap the new collection in."""
+        result, _ = self._call(REBUILD_FINISH, {"name": name})
+        return result["swapped"]
+
+    @contextmanager
+    def rebuild(self):
+        """Build a replacement collection inside the block, swap it in on success."""
+        name = self.begin_rebuild()
+        try:
+            yield name
+        except BaseException:
+            self.abort_rebuild(name)
+            raise
+        if not self.finish_rebuild(name):
+            raise RuntimeError("Rebuild aborted, the index was replaced meanwhile")
+
+    def similarity_search(
+        self, query: str, k: int = settings.retrieval_k, filter: Optional[Dict] = None
+    ) -> List[Tuple[Document, float]]:
+        """Search for similar documents with their similarity scores."""
+        from langchain_core.documents import Document
+
+        result, _ = self._call(SEARCH, {"query": query, "k": k, "filter": filter})
+        return [
+            (Document(page_content=text, metadata=metadata), score)
+            for text, metadata, score in result["results"]
+        ]
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = settings.retrieval_k,
+        filter: Optional[Dict] = None,
+    ) -> List[Tuple[Document, float]]:
+        """Search with an already computed query embedding."""
+        from langchain_core.documents import Document
+
+        result, _ = self._call(
+            SEARCH_VECTOR, {"k": k, "filter": filter}, vectors=[list(embedding)]
+        )
+        return [
+            (Document(page_content=text, metadata=metadata), score)
+            for text, metadata, score in result["results"]
+        ]
+
+    def mmr_search_by_vector(
+        self,
+        embedding: List[float],
+        fetch_k: int = settings.mmr_fetch_k,
+        filter: Optional[Dict] = None,
+    ) -> List[Tuple[Document, float]]:
+        """Over-fetch candidates and pick a diverse, adaptively sized subset."""
+        from langchain_core.documents import Document
+
+        result, _ = self._call(
+            SEARCH_MMR,
+            {"fetch_k": fetch_k, "filter": filter},
+            vectors=[list(embedding)],
+        )
+        return [
+            (Document(page_content=text, metadata=metadata), score)
+            for text, metadata, score in result["results"]
+        ]
+
+    def clear(self) -> None:
+        """Clear all documents from the vector store."""
+        self._call(CLEAR, {})
+
+    def clear_all(self, upload_path: str) -> Dict[str, int]:
+        """Clear both vector store and uploaded files."""
+        result, _ = self._call(CLEAR_ALL, {"upload_path": upload_path})
+        return result
+
+    def get_document_info(self) -> List[Dict]:
+        """Get information about all documents in the vector store."""
+        result, _ = self._call(DOCUMENT_INFO, {})
+        return result["documents"]
+
+    def get_chunks(self, limit: int = 100, offset: int = 0) -> Tuple[List[Dict], int]:
+        """Get chunks with their text and metadata."""
+        result, _ = self._call(GET_CHUNKS, {"limit": limit, "offset": offset})
+        return result["chunks"], result["total_count"]
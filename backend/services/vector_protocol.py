@@ -0,0 +1,93 @@
+"""Binary framing shared by the vector index server and its clients.
+
+Every message is a fixed header followed by a body:
+
+    header: body length u32 | opcode u8 | request id u32   (little-endian)
+    body:   JSON length u32 | JSON payload | float32 vectors (optional)
+
+Vectors travel as raw float32 rows after the JSON payload, whose ``dim`` and
+``rows`` keys describe their shape, so embeddings are never JSON-encoded.
+Responses reuse the request id with a status opcode.
+"""
+
+import json
+import struct
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+HEADER = struct.Struct("<IBI")
+JSON_LENGTH = struct.Struct("<I")
+
+# Request opcodes
+PING = 1
+ADD_DOCUMENTS = 2
+SEARCH = 3
+DOCUMENT_INFO = 4
+GET_CHUNKS = 5
+CLEAR_ALL = 6
+CLEAR = 7
+GET_RECORDS = 8
+UPSERT_EMBEDDINGS = 9
+DELETE_IDS = 10
+REPLACE_SUMMARY_NODES = 11
+DELETE_DOCUMENT = 12
+COMPACT = 13
+SEARCH_VECTOR = 14
+SEARCH_MMR = 15
+REBUILD_BEGIN = 16
+REBUILD_UPSERT = 17
+REBUILD_FINISH = 18
+REBUILD_ABORT = 19
+
+# Response opcodes
+STATUS_OK = 0
+STATUS_ERROR = 255
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode_vectors(vectors) -> Tuple[bytes, int, int]:
+    """Pack a list of equal-length vectors (or a 2-D numpy array) as float32"""
+    if vectors is None or len(vectors) == 0:
+        return b"", 0, 0
+    if hasattr(vectors, "astype"):
+        rows, dim = vectors.shape
+        return vectors.astype("<f4").tobytes(), rows, dim
+
+    buffer = array("f")
+    for vector in vectors:
+        buffer.extend(vector)
+    return buffer.tobytes(), len(vectors), len(vectors[0])
+
+
+def decode_vectors(blob: bytes, rows: int, dim: int) -> List[List[float]]:
+    values = array("f")
+    values.frombytes(blob)
+    return [values[i * dim : (i + 1) * dim].tolist() for i in range(rows)]
+
+
+def encode_body(payload: Dict[str, Any], vectors=None) -> bytes:
+    blob, rows, dim = encode_vectors(vectors)
+    if rows:
+        payload = {**payload, "rows": rows, "dim": dim}
+    meta = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+    return JSON_LENGTH.pack(len(meta)) + meta + blob
+
+
+def decode_body(body: bytes) -> Tuple[Dict[str, Any], Optional[List[List[float]]]]:
+    (meta_length,) = JSON_LENGTH.unpack_from(body, 0)
+    meta_end = JSON_LENGTH.size + meta_length
+    payload = json.loads(body[JSON_LENGTH.size : meta_end])
+
+    vectors = None
+    rows = payload.pop("rows", 0)
+    dim = payload.pop("dim", 0)
+    if rows:
+        vectors = decode_vectors(body[meta_end:], rows, dim)
+    return payload, vectors
+
+
+def encode_frame(opcode: int, request_id: int, body: bytes) -> bytes:
+    return HEADER.pack(len(body), opcode, request_id) + body
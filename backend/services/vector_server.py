@@ -0,0 +1,347 @@
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+from services.vector_protocol import (
+    HEADER,
+    STATUS_OK,
+    STATUS_ERROR,
+    PING,
+    ADD_DOCUMENTS,
+    SEARCH,
+    DOCUMENT_INFO,
+    GET_CHUNKS,
+    CLEAR_ALL,
+    CLEAR,
+    GET_RECORDS,
+    UPSERT_EMBEDDINGS,
+    DELETE_IDS,
+    REPLACE_SUMMARY_NODES,
+    DELETE_DOCUMENT,
+    COMPACT,
+    SEARCH_VECTOR,
+    SEARCH_MMR,
+    REBUILD_BEGIN,
+    REBUILD_UPSERT,
+    REBUILD_FINISH,
+    REBUILD_ABORT,
+    ProtocolError,
+    decode_body,
+    encode_body,
+    encode_frame,
+)
+
+logger = logging.getLogger(__name__)
+
+Result = Tuple[Dict[str, Any], Optional[Any]]
+
+
+def _documents(texts: List[str], metadatas: List[Dict[str, Any]]):
+    from langchain_core.documents import Document
+
+    return [
+        Document(page_content=text, metadata=metadata)
+        for text, metadata in zip(texts, metadatas)
+    ]
+
+
+class VectorIndexServer:
+    """Single owner of the vector index, serving workers over a Unix socket.
+
+    Writes run one at a time in arrival order, so they are serialized and
+    visible to every worker as soon as they are acknowledged. Searches that
+    arrive within a short window are embedded and queried as one batch.
+    """
+
+    def __init__(self, vector_store, socket_path: str = settings.vector_socket_path):
+        self.vector_store = vector_store
+        self.socket_path = socket_path
+        self._read_pool = ThreadPoolExecutor(
+            max_workers=settings.vector_server_read_workers,
+            thread_name_prefix="vector-read",
+        )
+        self._write_pool = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="vector-write"
+        )
+        self._search_queue: Optional[asyncio.Queue] = None
+        self._tasks = set()
+        self._writers = set()
+
+        self._reads = {
+            PING: lambda payload, vectors: ({"ok": True}, None),
+            DOCUMENT_INFO: self._document_info,
+            GET_CHUNKS: self._get_chunks,
+            GET_RECORDS: self._get_records,
+            SEARCH_VECTOR: self._search_vector,
+            SEARCH_MMR: self._search_mmr,
+        }
+        self._writes = {
+            ADD_DOCUMENTS: self._add_documents,
+            CLEAR_ALL: self._clear_all,
+            CLEAR: self._clear,
+            UPSERT_EMBEDDINGS: self._upsert_embeddings,
+            DELETE_IDS: self._delete_ids,
+            REPLACE_SUMMARY_NODES: self._replace_summary_nodes,
+            DELETE_DOCUMENT: self._delete_document,
+        }
+        self._rebuilds = {
+            REBUILD_BEGIN: self._rebuild_begin,
+            REBUILD_UPSERT: self._rebuild_upsert,
+            REBUILD_FINISH: self._rebuild_finish,
+            REBUILD_ABORT: self._rebuild_abort,
+        }
+
+    async def serve_forever(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        self._search_queue = asyncio.Queue()
+        batcher = asyncio.create_task(self._search_batcher())
+
+        server = await asyncio.start_unix_server(
+            self._handle_connection, path=self.socket_path
+        )
+        os.chmod(self.socket_path, 0o600)
+        logger.info(f"Vector index server listening on {self.socket_path}")
+
+        try:
+            # Serves until cancelled. Server.serve_forever() is not used: on
+            # cancellation it waits for connected workers to hang up first.
+            await asyncio.Event().wait()
+        finally:
+            server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await server.wait_closed()
+            batcher.cancel()
+            self._write_pool.shutdown(wait=True)
+            self._read_pool.shutdown(wait=False)
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _handle_connection(self, reader, writer) -> None:
+        write_lock = asyncio.Lock()
+        self._writers.add(writer)
+        try:
+            while True:
+                header = await reader.readexactly(HEADER.size)
+                length, opcode, request_id = HEADER.unpack(header)
+                body = await reader.readexactly(length)
+                # Requests on one connection may be pipelined and answered out of order
+                self._spawn(self._respond(writer, write_lock, opcode, request_id, body))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _respond(self, writer, write_lock, opcode, request_id, body) -> None:
+        try:
+            payload, vectors = decode_body(body)
+            result, result_vectors = await self._dispatch(opcode, payload, vectors)
+            frame = encode_frame(
+                STATUS_OK, request_id, encode_body(result, result_vectors)
+            )
+        except Exception as e:
+            logger.error(f"Error handling vector request {opcode}: {str(e)}")
+            frame = encode_frame(STATUS_ERROR, request_id, encode_body({"error": str(e)}))
+
+        async with write_lock:
+            try:
+                writer.write(frame)
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    async def _dispatch(self, opcode: int, payload, vectors) -> Result:
+        loop = asyncio.get_running_loop()
+
+        if opcode == SEARCH:
+            future = loop.create_future()
+            await self._search_queue.put((payload, future))
+            return await future
+        if opcode in self._reads:
+            return await loop.run_in_executor(
+                self._read_pool, self._reads[opcode], payload, vectors
+            )
+        if opcode == COMPACT:
+            # Compaction copies the whole index; keep it off the write thread
+            return await loop.run_in_executor(None, self._compact, payload, vectors)
+        if opcode in self._rebuilds:
+            # Rebuilds write to a separate collection, off the write thread too
+            return await loop.run_in_executor(
+                None, self._rebuilds[opcode], payload, vectors
+            )
+        if opcode in self._writes:
+            return await loop.run_in_executor(
+                self._write_pool, self._writes[opcode], payload, vectors
+            )
+        raise ProtocolError(f"Unknown opcode {opcode}")
+
+    async def _search_batcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        window = settings.vector_server_batch_window_ms / 1000
+
+        while True:
+            batch = [await self._search_queue.get()]
+            deadline = loop.time() + window
+            while len(batch) < settings.vector_server_max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self._search_queue.get(), timeout)
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+            # Queries can only share an index call when k and filter match
+            groups: Dict[Tuple[int, str], list] = {}
+            for payload, future in batch:
+                key = (payload["k"], json.dumps(payload.get("filter"), sort_keys=True))
+                groups.setdefault(key, []).append((payload, future))
+
+            for (k, _), items in groups.items():
+                self._spawn(self._search_group(k, items))
+
+    async def _search_group(self, k: int, items) -> None:
+        loop = asyncio.get_running_loop()
+        queries = [payload["query"] for payload, _ in items]
+        try:
+            batches = await loop.run_in_executor(
+                self._read_pool,
+                lambda: self.vector_store.similarity_search_batch(
+                    queries, k=k, filter=items[0][0].get("filter")
+                ),
+            )
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), results in zip(items, batches):
+            if not future.done():
+                future.set_result(
+                    (
+                        {
+                            "results": [
+                                [document.page_content, document.metadata, score]
+                                for document, score in results
+                            ]
+                        },
+                        None,
+                    )
+                )
+
+    def _search_vector(self, payload, vectors) -> Result:
+        results = self.vector_store.similarity_search_by_vector(
+            vectors[0], k=payload["k"], filter=payload.get("filter")
+        )
+        return {
+            "results": [
+                [document.page_content, document.metadata, score]
+                for document, score in results
+            ]
+        }, None
+
+    def _search_mmr(self, payload, vectors) -> Result:
+        results = self.vector_store.mmr_search_by_vector(
+            vectors[0], fetch_k=payload["fetch_k"], filter=payload.get("filter")
+        )
+        return {
+            "results": [
+                [document.page_content, document.metadata, score]
+                for document, score in results
+            ]
+        }, None
+
+    def _document_info(self, payload, vectors) -> Result:
+        return {"documents": self.vector_store.get_document_info()}, None
+
+    def _get_chunks(self, payload, vectors) -> Result:
+        chunks, total_count = self.vector_store.get_chunks(
+            limit=payload["limit"], offset=payload["offset"]
+        )
+        return {"chunks": chunks, "total_count": total_count}, None
+
+    def _get_records(self, payload, vectors) -> Result:
+        results = self.vector_store.get_records(
+            include_embeddings=payload.get("include_embeddings", False),
+            where=payload.get("where"),
+            ids=payload.get("ids"),
+        )
+        records = {
+            "ids": results["ids"],
+            "documents": results["documents"],
+            "metadatas": results["metadatas"],
+        }
+        return records, results.get("embeddings")
+
+    def _add_documents(self, payload, vectors) -> Result:
+        documents = _documents(payload["texts"], payload["metadatas"])
+        self.vector_store.add_documents(documents)
+        return {"count": len(documents)}, None
+
+    def _clear_all(self, payload, vectors) -> Result:
+        return self.vector_store.clear_all(payload["upload_path"]), None
+
+    def _clear(self, payload, vectors) -> Result:
+        self.vector_store.clear()
+        return {"ok": True}, None
+
+    def _upsert_embeddings(self, payload, vectors) -> Result:
+        self.vector_store.upsert_embeddings(
+            payload["ids"], vectors or [], payload["texts"], payload["metadatas"]
+        )
+        return {"count": len(payload["ids"])}, None
+
+    def _delete_ids(self, payload, vectors) -> Result:
+        self.vector_store.delete_ids(payload["ids"])
+        return {"count": len(payload["ids"])}, None
+
+    def _replace_summary_nodes(self, payload, vectors) -> Result:
+        nodes = _documents(payload["texts"], payload["metadatas"])
+        self.vector_store.replace_summary_nodes(payload["source"], nodes)
+        return {"count": len(nodes)}, None
+
+    def _delete_document(self, payload, vectors) -> Result:
+        count = self.vector_store.delete_document(
+            payload["source"], chunks_only=payload.get("chunks_only", False)
+        )
+        return {"count": count}, None
+
+    def _rebuild_begin(self, payload, vectors) -> Result:
+        return {"name": self.vector_store.begin_rebuild()}, None
+
+    def _rebuild_upsert(self, payload, vectors) -> Result:
+        self.vector_store.upsert_rebuild(
+            payload["name"],
+            payload["ids"],
+            vectors,
+            payload["texts"],
+            payload["metadatas"],
+        )
+        return {"count": len(payload["ids"])}, None
+
+    def _rebuild_finish(self, payload, vectors) -> Result:
+        return {"swapped": self.vector_store.finish_rebuild(payload["name"])}, None
+
+    def _rebuild_abort(self, payload, vectors) -> Result:
+        self.vector_store.abort_rebuild(payload["name"])
+        return {"aborted": True}, None
+
+    def _compact(self, payload, vectors) -> Result:
+        if payload.get("force"):
+            return {"compacted": self.vector_store.compact()}, None
+        return {"compacted": self.vector_store.maybe_compact()}, None
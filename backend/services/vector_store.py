@@ -1,23 +1,36 @@
-from typing import List, Tuple, Dict
-from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
-from langchain.schema import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import List, Tuple, Dict, Any, Optional, TYPE_CHECKING
 import os
-from dotenv import load_dotenv
+import json
 import logging
+import threading
+import time
 from datetime import datetime
 import uuid
 
 from config import settings
+from services.document_summarizer import DOCUMENT_SUMMARY, SUMMARY_NODE_TYPES
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
 
 logger = logging.getLogger(__name__)
 
-load_dotenv()
+DEFAULT_COLLECTION = "langchain"
+INDEX_STATE_FILENAME = "index_state.json"
+
+# Searches started just before a compaction swap may still read the old collection
+OLD_COLLECTION_GRACE_SECONDS = 5
 
 
 class VectorStore:
     def __init__(self):
+        # Heavy LangChain / Chroma imports are deferred until the store is built
+        from langchain_openai import OpenAIEmbeddings
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
         self.embeddings = OpenAIEmbeddings(
             openai_api_key=settings.openai_api_key, model=settings.embedding_model
         )
@@ -28,21 +41,318 @@ class VectorStore:
             length_function=len,
         )
 
-        self.vector_store = Chroma(
+        # Serializes writes so snapshots and bulk operations see a consistent view
+        self.write_lock = threading.RLock()
+
+        # Compaction and re-indexing build a new collection in the background;
+        # ids written meanwhile are tracked so they can be reconciled before the swap
+        self._compaction_lock = threading.Lock()
+        self._dirty_ids: Optional[set] = None
+        self._compaction_aborted = False
+        self._rebuild_source = None
+        self._rebuild_target = None
+
+        self._state = self._read_state()
+        self.vector_store = self._open_collection(self._state["collection"])
+
+    def _state_path(self) -> str:
+        return os.path.join(settings.vector_db_path, INDEX_STATE_FILENAME)
+
+    def _read_state(self) -> Dict[str, Any]:
+        state = {"collection": DEFAULT_COLLECTION, "deleted_since_compaction": 0}
+        try:
+            with open(self._state_path()) as f:
+                state.update(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        return state
+
+    def _write_state(self) -> None:
+        os.makedirs(settings.vector_db_path, exist_ok=True)
+        tmp_path = f"{self._state_path()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._state, f)
+        os.replace(tmp_path, self._state_path())
+
+    def _open_collection(self, collection_name: str):
+        from langchain_chroma import Chroma
+
+        return Chroma(
+            collection_name=collection_name,
             persist_directory=settings.vector_db_path,
             embedding_function=self.embeddings,
         )
 
+    def _mark_dirty(self, ids) -> None:
+        if self._dirty_ids is not None:
+            self._dirty_ids.update(ids)
+
     def add_documents(self, documents: List[Document]) -> None:
         """Add documents to the vector store."""
         texts = self.text_splitter.split_documents(documents)
-        self.vector_store.add_documents(texts)
+        with self.write_lock:
+            ids = self.vector_store.add_documents(texts)
+            self._mark_dirty(ids)
+
+    @property
+    def collection(self):
+        """Underlying Chroma collection."""
+        return self.vector_store._collection
+
+    def get_records(
+        self,
+        include_embeddings: bool = False,
+        where: Optional[Dict] = None,
+        ids: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Get ids, texts and metadata (and optionally embeddings) of stored chunks."""
+        include = ["documents", "metadatas"]
+        if include_embeddings:
+            include.append("embeddings")
+        return self.collection.get(ids=ids, where=where, include=include)
+
+    def upsert_embeddings(
+        self,
+        ids: List[str],
+        embeddings,
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+    ) -> None:
+        """Insert or replace chunks whose embeddings are already computed."""
+        batch_size = settings.vector_db_batch_size
+        with self.write_lock:
+            for start in range(0, len(ids), batch_size):
+                end = start + batch_size
+                self.collection.upsert(
+                    ids=ids[start:end],
+                    embeddings=embeddings[start:end],
+                    documents=texts[start:end],
+                    metadatas=metadatas[start:end],
+                )
+            self._mark_dirty(ids)
+
+    def delete_ids(self, ids: List[str]) -> None:
+        """Delete chunks by id."""
+        batch_size = settings.vector_db_batch_size
+        with self.write_lock:
+            for start in range(0, len(ids), batch_size):
+                self.collection.delete(ids=ids[start : start + batch_size])
+            self._mark_dirty(ids)
+
+            if ids:
+                self._state["deleted_since_compaction"] += len(ids)
+                self._write_state()
+
+    def replace_summary_nodes(self, source: str, nodes: List[Document]) -> None:
+        """Store summary nodes of a document as-is, replacing its previous ones."""
+        with self.write_lock:
+            previous = self.collection.get(
+                where={
+                    "$and": [
+                        {"source": source},
+                        {"node_type": {"$in": SUMMARY_NODE_TYPES}},
+                    ]
+                },
+                include=[],
+            )
+            ids = [f"summary:{source}:{i}" for i in range(len(nodes))]
+            kept_ids = set(ids)
+            stale_ids = [id_ for id_ in previous["ids"] if id_ not in kept_ids]
+            self.delete_ids(stale_ids)
+
+            if nodes:
+                self.vector_store.add_documents(nodes, ids=ids)
+                self._mark_dirty(ids)
+
+    def delete_document(self, source: str, chunks_only: bool = False) -> int:
+        """Delete every chunk and summary node of one source document.
+
+        With ``chunks_only`` the summary nodes are kept.
+        """
+        with self.write_lock:
+            results = self.collection.get(
+                where={"source": source}, include=["metadatas"]
+            )
+            ids = [
+                record_id
+                for record_id, metadata in zip(results["ids"], results["metadatas"])
+                if not chunks_only
+                or (metadata or {}).get("node_type") not in SUMMARY_NODE_TYPES
+            ]
+            self.delete_ids(ids)
+        logger.info(f"Deleted {len(ids)} chunks of {source}")
+        return len(ids)
+
+    def needs_compaction(self) -> bool:
+        """Whether enough chunks were deleted since the last compaction."""
+        deleted = self._state["deleted_since_compaction"]
+        if deleted < settings.compaction_min_deletions:
+            return False
+        total = self.collection.count() + deleted
+        return deleted / max(total, 1) >= settings.compaction_threshold
+
+    def maybe_compact(self) -> bool:
+        """Compact the index if the deletion threshold has been reached."""
+        if not self.needs_compaction():
+            return False
+        return self.compact()
+
+    def _copy_records(self, source, target, ids: List[str]) -> None:
+        # Copying by id, not by offset, so deletes during the copy cannot
+        # shift later pages and skip live records
+        include = ["documents", "metadatas", "embeddings"]
+        batch_size = settings.vector_db_batch_size
+
+        for start in range(0, len(ids), batch_size):
+            records = source.get(ids=ids[start : start + batch_size], include=include)
+            if records["ids"]:
+                target.upsert(
+                    ids=records["ids"],
+                    embeddings=records["embeddings"],
+                    documents=records["documents"],
+                    metadatas=records["metadatas"],
+                )
+
+    def begin_rebuild(self) -> str:
+        """Start building a replacement collection; returns its name.
+
+        Until finish_rebuild swaps it in, searches and writes keep using the
+        current collection. Ids written meanwhile are tracked so they can be
+        reconciled before the swap.
+        """
+        if not self._compaction_lock.acquire(blocking=False):
+            raise RuntimeError("Another rebuild of the index is running")
+
+        with self.write_lock:
+            self._rebuild_source = self.vector_store
+            self._dirty_ids = set()
+            self._compaction_aborted = False
+
+        name = f"{DEFAULT_COLLECTION}_{int(time.time() * 1000)}"
+        self._rebuild_target = self._open_collection(name)
+        return name
+
+    def _check_rebuild(self, name: str):
+        target = self._rebuild_target
+        if target is None or target._collection.name != name:
+            raise RuntimeError(f"No rebuild of collection {name} is running")
+        return target
+
+    def upsert_rebuild(
+        self,
+        name: str,
+        ids: List[str],
+        embeddings,
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+    ) -> None:
+        """Write chunks into the collection being rebuilt."""
+        target = self._check_rebuild(name)
+        batch_size = settings.vector_db_batch_size
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            target._collection.upsert(
+                ids=ids[start:end],
+                embeddings=embeddings[start:end],
+                documents=texts[start:end],
+                metadatas=metadatas[start:end],
+            )
+
+    def _end_rebuild(self) -> None:
+        self._rebuild_source = None
+        self._rebuild_target = None
+        self._dirty_ids = None
+        self._compaction_lock.release()
+
+    def abort_rebuild(self, name: str) -> None:
+        """Drop the collection being rebuilt and keep the current one."""
+        target = self._check_rebuild(name)
+        try:
+            target.delete_collection()
+        finally:
+            self._end_rebuild()
+
+    def finish_rebuild(self, name: str) -> bool:
+        """Reconcile writes made during the rebuild and swap the new collection in."""
+        new_store = self._check_rebuild(name)
+        old_store = self._rebuild_source
+        try:
+            with self.write_lock:
+                if self._compaction_aborted or self.vector_store is not old_store:
+                    new_store.delete_collection()
+                    logger.info("Rebuild aborted, the index was replaced meanwhile")
+                    return False
+
+                dirty_ids = list(self._dirty_ids)
+                if dirty_ids:
+                    live = set(
+                        old_store._collection.get(ids=dirty_ids, include=[])["ids"]
+                    )
+                    self._copy_records(
+                        old_store._collection, new_store._collection, ids=list(live)
+                    )
+                    removed = [id_ for id_ in dirty_ids if id_ not in live]
+                    if removed:
+                        new_store._collection.delete(ids=removed)
+
+                self.vector_store = new_store
+                self._state = {"collection": name, "deleted_since_compaction": 0}
+                self._write_state()
+        finally:
+            self._end_rebuild()
+
+        time.sleep(OLD_COLLECTION_GRACE_SECONDS)
+        old_store.delete_collection()
+        return True
+
+    @contextmanager
+    def rebuild(self):
+        """Build a replacement collection inside the block, swap it in on success."""
+        name = self.begin_rebuild()
+        try:
+            yield name
+        except BaseException:
+            self.abort_rebuild(name)
+            raise
+        if not self.finish_rebuild(name):
+            raise RuntimeError("Rebuild aborted, the index was replaced meanwhile")
+
+    def compact(self) -> bool:
+        """Rebuild the index into a fresh collection and swap it in.
+
+        Searches keep using the current collection while live records are
+        copied, so they never block; writes only wait for the final catch-up
+        of ids changed during the copy.
+        """
+        start_time = time.time()
+        try:
+            name = self.begin_rebuild()
+        except RuntimeError:
+            logger.info("Compaction already running")
+            return False
+
+        try:
+            with self.write_lock:
+                ids = self._rebuild_source._collection.get(include=[])["ids"]
+            self._copy_records(
+                self._rebuild_source._collection, self._rebuild_target._collection, ids
+            )
+        except BaseException:
+            self.abort_rebuild(name)
+            raise
+
+        if not self.finish_rebuild(name):
+            return False
+        logger.info(f"Compacted index into {name} in {time.time() - start_time:.1f}s")
+        return True
 
     def similarity_search(
-        self, query: str, k: int = settings.retrieval_k
+        self, query: str, k: int = settings.retrieval_k, filter: Optional[Dict] = None
     ) -> List[Tuple[Document, float]]:
         """Search for similar documents with their similarity scores."""
-        results = self.vector_store.similarity_search_with_score(query, k=k)
+        results = self.vector_store.similarity_search_with_score(
+            query, k=k, filter=filter
+        )
 
         #  Lower score represents more similarity
         filtered_results = [
@@ -53,13 +363,120 @@ class VectorStore:
 
         return filtered_results
 
+    def similarity_search_batch(
+        self,
+        queries: List[str],
+        k: int = settings.retrieval_k,
+        filter: Optional[Dict] = None,
+    ) -> List[List[Tuple[Document, float]]]:
+        """Search several queries with one embedding call and one index query."""
+        from langchain_core.documents import Document
+
+        vectors = self.embeddings.embed_documents(queries)
+        results = self.collection.query(
+            query_embeddings=vectors,
+            n_results=k,
+            where=filter,
+            include=["documents", "metadatas", "distances"],
+        )
+
+        batches = []
+        for texts, metadatas, distances in zip(
+            results["documents"], results["metadatas"], results["distances"]
+        ):
+            batches.append(
+                [
+                    (Document(page_content=text, metadata=metadata or {}), distance)
+                    for text, metadata, distance in zip(texts, metadatas, distances)
+                    if distance <= settings.similarity_threshold
+                ]
+            )
+        return batches
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = settings.retrieval_k,
+        filter: Optional[Dict] = None,
+    ) -> List[Tuple[Document, float]]:
+        """Search with an already computed query embedding."""
+        from langchain_core.documents import Document
+
+        results = self.collection.query(
+            query_embeddings=[list(embedding)],
+            n_results=k,
+            where=filter,
+            include=["documents", "metadatas", "distances"],
+        )
+
+        return [
+            (Document(page_content=text, metadata=metadata or {}), distance)
+            for text, metadata, distance in zip(
+                results["documents"][0], results["metadatas"][0], results["distances"][0]
+            )
+            if distance <= settings.similarity_threshold
+        ]
+
+    def mmr_search_by_vector(
+        self,
+        embedding: List[float],
+        fetch_k: int = settings.mmr_fetch_k,
+        filter: Optional[Dict] = None,
+    ) -> List[Tuple[Document, float]]:
+        """Over-fetch candidates and pick a diverse, adaptively sized subset."""
+        from langchain_core.documents import Document
+        from services.mmr import mmr_select, trim_to_relevant
+
+        results = self.collection.query(
+            query_embeddings=[list(embedding)],
+            n_results=fetch_k,
+            where=filter,
+            include=["documents", "metadatas", "distances", "embeddings"],
+        )
+
+        candidates = [
+            (text, metadata, distance, vector)
+            for text, metadata, distance, vector in zip(
+                results["documents"][0],
+                results["metadatas"][0],
+                results["distances"][0],
+                results["embeddings"][0],
+            )
+            if distance <= settings.similarity_threshold
+        ]
+        if not candidates:
+            return []
+
+        selected, relevance = mmr_select(
+            embedding,
+            [vector for _, _, _, vector in candidates],
+            k=settings.retrieval_max_k,
+            lambda_mult=settings.mmr_lambda,
+        )
+        selected = trim_to_relevant(
+            selected,
+            relevance,
+            min_k=settings.retrieval_min_k,
+            max_k=settings.retrieval_max_k,
+            min_gap=settings.retrieval_min_gap,
+        )
+
+        documents = []
+        for index in selected:
+            text, metadata, distance, _ = candidates[index]
+            documents.append(
+                (Document(page_content=text, metadata=metadata or {}), distance)
+            )
+        return documents
+
     def clear(self) -> None:
         """Clear all documents from the vector store."""
-        self.vector_store.delete_collection()
-        self.vector_store = Chroma(
-            persist_directory=os.getenv("VECTOR_DB_PATH", "data/vector_store"),
-            embedding_function=self.embeddings,
-        )
+        with self.write_lock:
+            self._compaction_aborted = True
+            self.vector_store.delete_collection()
+            self.vector_store = self._open_collection(self._state["collection"])
+            self._state["deleted_since_compaction"] = 0
+            self._write_state()
 
     def clear_all(self, upload_path: str) -> Dict[str, int]:
         """Clear both vector store and uploaded files."""
@@ -104,7 +521,12 @@ class VectorStore:
                         "chunks_count": 0,
                         "status": "processed",
                     }
-                documents[source]["chunks_count"] += 1
+
+                node_type = metadata.get("node_type")
+                if node_type == DOCUMENT_SUMMARY:
+                    documents[source]["status"] = "summarized"
+                if node_type not in SUMMARY_NODE_TYPES:
+                    documents[source]["chunks_count"] += 1
 
             return list(documents.values())
 
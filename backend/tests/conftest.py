@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import settings  # noqa: E402
+
+
+@pytest.fixture
+def test_settings(tmp_path, monkeypatch):
+    """Point every on-disk path at a temporary directory"""
+    monkeypatch.setattr(settings, "openai_api_key", "test")
+    monkeypatch.setattr(settings, "vector_db_path", str(tmp_path / "vector_store"))
+    monkeypatch.setattr(settings, "pdf_upload_path", str(tmp_path / "uploads"))
+    monkeypatch.setattr(settings, "page_cache_path", str(tmp_path / "page_cache"))
+    monkeypatch.setattr(settings, "snapshot_path", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(settings, "ingest_state_path", str(tmp_path / "ingest.json"))
+    monkeypatch.setattr(settings, "profile_dir", str(tmp_path / "profiles"))
+    return settings
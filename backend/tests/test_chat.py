@@ -0,0 +1,203 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db import Conversation, Message
+from db.models import Base
+from db.session import get_session
+from main import app
+from routes import chat as chat_route
+from services.container import (
+    get_conversation_cache,
+    get_message_writer,
+    get_rag_pipeline,
+)
+from services.conversation_cache import ConversationCache, ConversationState
+
+
+class FakePipeline:
+    def __init__(
+        self, fail_generation=False, fail_rewrite=False, rewrite=None, rewrite_delay=0
+    ):
+        self.fail_generation = fail_generation
+        self.fail_rewrite = fail_rewrite
+        self.rewrite = rewrite
+        self.rewrite_delay = rewrite_delay
+        self.retrievals = []
+        self.documents = None
+
+    def embed_query(self, question):
+        return [0.0]
+
+    def retrieve(self, question, embedding=None):
+        self.retrievals.append((question, embedding))
+        return [f"chunk for {question}"]
+
+    async def arewrite_question(self, question, chat_history=None):
+        if self.fail_rewrite:
+            raise RuntimeError("rate limited")
+        await asyncio.sleep(self.rewrite_delay)
+        return self.rewrite
+
+    async def agenerate_llm_response(self, question, documents, chat_history=None):
+        if self.fail_generation:
+            raise RuntimeError("LLM unavailable")
+        self.documents = documents
+        return f"answer to {question}"
+
+    @staticmethod
+    def build_sources(documents):
+        return []
+
+
+class FakeWriter:
+    def __init__(self):
+        self.writes = []
+
+    def add_conversation(self, token, name):
+        self.writes.append(("conversation", token, name))
+
+    def rename_conversation(self, token, name):
+        self.writes.append(("rename", token, name))
+
+    def add_message(self, token, role, content, created_at=None):
+        self.writes.append(("message", role, content))
+
+    def flush(self):
+        pass
+
+
+class FakeNameGenerator:
+    def __init__(self, question, answer):
+        pass
+
+    async def agenerate(self):
+        return "Title"
+
+
+@pytest.fixture
+def client(test_settings, monkeypatch):
+    monkeypatch.setattr(chat_route, "ConversationNameGenerator", FakeNameGenerator)
+    writer = FakeWriter()
+    app.dependency_overrides[get_message_writer] = lambda: writer
+    app.dependency_overrides[get_conversation_cache] = ConversationCache
+    yield TestClient(app), writer
+    app.dependency_overrides.clear()
+
+
+def test_failed_generation_persists_nothing(client):
+    test_client, writer = client
+    app.dependency_overrides[get_rag_pipeline] = lambda: FakePipeline(
+        fail_generation=True
+    )
+
+    response = test_client.post("/api/chat", json={"question": "revenue?"})
+
+    assert response.status_code == 500
+    assert writer.writes == []
+
+
+def test_failed_rewrite_answers_original_question(client, monkeypatch):
+    test_client, writer = client
+    monkeypatch.setattr(chat_route.settings, "query_rewrite_enabled", True)
+    app.dependency_overrides[get_rag_pipeline] = lambda: FakePipeline(
+        fail_rewrite=True
+    )
+
+    response = test_client.post("/api/chat", json={"question": "revenue?"})
+
+    assert response.status_code == 200
+    assert response.json()["answer"] == "answer to revenue?"
+    assert writer.writes == [
+        ("conversation", response.json()["conversation_token"], "Title"),
+        ("message", "user", "revenue?"),
+        ("message", "assistant", "answer to revenue?"),
+    ]
+
+
+def test_cached_history_reloads_when_db_has_more_messages(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+
+    session = session_factory()
+    session.add(Conversation(token="t", name="Title"))
+    session.add(Message(conversation_token="t", role="user", content="q1"))
+    session.add(Message(conversation_token="t", role="assistant", content="a1"))
+    session.commit()
+    session.close()
+
+    cached = ConversationState("t", "Title")
+    cached.append("user", "q1")
+    cached.append("assistant", "a1")
+    assert chat_route._load_conversation(session_factory(), "t", cached) is cached
+
+    # Another worker answered a turn
+    session = session_factory()
+    session.add(Message(conversation_token="t", role="user", content="q2"))
+    session.add(Message(conversation_token="t", role="assistant", content="a2"))
+    session.commit()
+    session.close()
+
+    state = chat_route._load_conversation(session_factory(), "t", cached)
+    assert state is not cached
+    assert [message.content for message in state.history] == ["q1", "a1", "q2", "a2"]
+
+
+class FailingSession:
+    def __enter__(self):
+        raise AssertionError("the database was read")
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+def test_cached_conversation_skips_the_database(client, monkeypatch):
+    test_client, writer = client
+    monkeypatch.setattr(chat_route.settings, "conversation_cache_check_db", False)
+    cache = ConversationCache()
+    cached = ConversationState("t", "Title")
+    cached.append("user", "q1")
+    cached.append("assistant", "a1")
+    cache.put(cached)
+    app.dependency_overrides[get_conversation_cache] = lambda: cache
+    app.dependency_overrides[get_session] = FailingSession
+    app.dependency_overrides[get_rag_pipeline] = FakePipeline
+
+    response = test_client.post(
+        "/api/chat", json={"question": "q2", "conversation_token": "t"}
+    )
+
+    assert response.status_code == 200
+    assert [message.content for message in cache.get("t").history] == [
+        "q1",
+        "a1",
+        "q2",
+        "answer to q2",
+    ]
+
+
+@pytest.mark.parametrize(
+    "rewrite_delay, expected",
+    [(0, ["chunk for standalone revenue?"]), (0.5, ["chunk for revenue?"])],
+)
+def test_rewrite_races_the_original_retrieval(
+    client, monkeypatch, rewrite_delay, expected
+):
+    test_client, writer = client
+    monkeypatch.setattr(chat_route.settings, "query_rewrite_enabled", True)
+    monkeypatch.setattr(chat_route.settings, "query_rewrite_timeout_ms", 200)
+    pipeline = FakePipeline(rewrite="standalone revenue?", rewrite_delay=rewrite_delay)
+    app.dependency_overrides[get_rag_pipeline] = lambda: pipeline
+
+    response = test_client.post("/api/chat", json={"question": "revenue?"})
+
+    assert response.status_code == 200
+    # The original question is retrieved with the prefetched embedding either way
+    assert ("revenue?", [0.0]) in pipeline.retrievals
+    assert pipeline.documents == expected
+    timings = response.json()["timings"]
+    assert timings["retrieval"]["start_ms"] <= timings["rewrite"]["end_ms"]
@@ -0,0 +1,93 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from db import Conversation, Message, setup_fts
+from db.models import Base
+from db.session import get_session
+from main import app
+from services.container import get_message_writer
+
+
+class FakeWriter:
+    def flush(self):
+        pass
+
+
+def _add_messages(session_factory, *contents):
+    with session_factory() as session:
+        if not session.get(Conversation, "t"):
+            session.add(Conversation(token="t", name="Results"))
+        for content in contents:
+            session.add(Message(conversation_token="t", role="user", content=content))
+        session.commit()
+
+
+def _search(session_factory, query):
+    with session_factory() as session:
+        return Message.search(session, query, limit=10)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}")
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+    session_factory = sessionmaker(bind=engine)
+    # Messages written before the index existed are backfilled
+    _add_messages(session_factory, "Quarterly revenue grew in Europe")
+    with engine.begin() as conn:
+        setup_fts(conn)
+    return session_factory
+
+
+def test_index_follows_inserts_updates_and_deletes(session_factory):
+    assert len(_search(session_factory, "revenue")) == 1
+
+    _add_messages(session_factory, "Operating margin fell")
+    assert [row["snippet"] for row in _search(session_factory, "margins")] == [
+        "Operating <mark>margin</mark> fell"
+    ]
+
+    with session_factory() as session:
+        session.execute(
+            text("UPDATE messages SET content = 'Net debt rose' WHERE id = 2")
+        )
+        session.commit()
+    assert _search(session_factory, "margin") == []
+    assert len(_search(session_factory, "debt")) == 1
+
+    with session_factory() as session:
+        session.execute(text("DELETE FROM messages WHERE id = 2"))
+        session.commit()
+    assert _search(session_factory, "debt") == []
+
+
+def test_snippets_are_html_escaped(session_factory):
+    _add_messages(session_factory, "<script>alert('revenue')</script>")
+
+    (row,) = _search(session_factory, "alert")
+
+    assert row["snippet"] == (
+        "&lt;script&gt;<mark>alert</mark>(&#x27;revenue&#x27;)&lt;/script&gt;"
+    )
+
+
+def test_search_endpoint_pages_results(session_factory):
+    _add_messages(session_factory, *[f"revenue note {i}" for i in range(4)])
+    app.dependency_overrides[get_session] = lambda: session_factory()
+    app.dependency_overrides[get_message_writer] = FakeWriter
+    try:
+        client = TestClient(app)
+        first = client.get("/api/conversations/search?q=revenue&limit=3").json()
+        second = client.get(
+            "/api/conversations/search?q=revenue&limit=3&offset=3"
+        ).json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert (len(first["results"]), first["has_more"]) == (3, True)
+    assert (len(second["results"]), second["has_more"]) == (2, False)
+    message_ids = [row["message_id"] for row in first["results"] + second["results"]]
+    assert sorted(message_ids) == [1, 2, 3, 4, 5]
@@ -0,0 +1,67 @@
+import pytest
+
+from services.document_summarizer import (
+    DocumentSummarizer,
+    pack_texts,
+    split_text,
+)
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    """Echoes a short summary naming the first line of its input"""
+
+    def __init__(self):
+        self.inputs = []
+
+    def invoke(self, prompt):
+        text = prompt[-1].content
+        self.inputs.append(text)
+        return FakeResponse(f"summary of {text.splitlines()[0][:40]}")
+
+    def batch(self, prompts, config=None):
+        return [self.invoke(prompt) for prompt in prompts]
+
+
+@pytest.fixture
+def summarizer(test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "summary_section_max_chars", 1000)
+    monkeypatch.setattr(test_settings, "summary_min_section_chars", 10)
+    summarizer = DocumentSummarizer(vector_store=None)
+    summarizer.llm = FakeLLM()
+    return summarizer
+
+
+def test_split_text_keeps_every_line():
+    text = "\n".join(f"line {i} " + "x" * 50 for i in range(100))
+    parts = split_text(text, 500)
+    assert all(len(part) <= 500 for part in parts)
+    assert "\n".join(parts) == text
+
+
+def test_pack_texts_respects_budget():
+    groups = pack_texts(["a" * 300] * 10, 1000)
+    assert [len(group) for group in groups] == [3, 3, 3, 1]
+
+
+def test_long_documents_are_reduced_without_truncation(summarizer):
+    pages = [
+        {
+            "page_number": number,
+            "content": f"NOTE {number} PROVISIONS\n" + "amount 123 due. " * 200,
+        }
+        for number in range(1, 41)
+    ]
+
+    nodes = summarizer.build_summary_nodes("report.pdf", pages)
+
+    # One document summary plus one summary per note
+    assert len(nodes) == 41
+    # No prompt exceeded the budget (plus the section header line)
+    assert all(len(text) <= 1200 for text in summarizer.llm.inputs)
+    # Long sections were split rather than cut
+    assert any("(part 4 of 4)" in text for text in summarizer.llm.inputs)
@@ -0,0 +1,164 @@
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services import indexing
+from services import vector_store as vector_store_module
+from services.indexing import BulkIngestor, Reindexer, chunk_id
+from services.page_cache import file_hash
+from services.vector_store import VectorStore
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[float(len(text)), 1.0, 0.0] for text in texts]
+
+
+def _chunks(task, missing=()):
+    source = task[0].split("/")[-1]
+    if source in missing:
+        return {"source": source, "digest": "d", "missing": True}
+    return {
+        "source": source,
+        "digest": "d",
+        "missing": False,
+        "cache_hit": True,
+        "pages": 1,
+        "ids": [f"{source}:{i}" for i in range(3)],
+        "texts": [f"{source} chunk {i}" for i in range(3)],
+        "metadatas": [{"source": source, "page": 1, "node_type": "chunk"}] * 3,
+    }
+
+
+def _file_chunks(file_path):
+    source = file_path.split("/")[-1]
+    digest = file_hash(file_path)
+    return {
+        "source": source,
+        "digest": digest,
+        "missing": False,
+        "cache_hit": True,
+        "pages": 1,
+        "ids": [chunk_id(source, digest, 1, i) for i in range(3)],
+        "texts": [f"{source} chunk {i}" for i in range(3)],
+        "metadatas": [{"source": source, "page": 1, "node_type": "chunk"}] * 3,
+    }
+
+
+@pytest.fixture
+def store(test_settings, monkeypatch, tmp_path):
+    monkeypatch.setattr(vector_store_module, "OLD_COLLECTION_GRACE_SECONDS", 0)
+    monkeypatch.setattr(test_settings, "embedding_batch_size", 2)
+    monkeypatch.setattr(test_settings, "embedding_max_workers", 1)
+    monkeypatch.setattr(indexing, "ProcessPoolExecutor", ThreadPoolExecutor)
+
+    upload_path = tmp_path / "uploads"
+    upload_path.mkdir()
+    for name in ("a.pdf", "b.pdf"):
+        (upload_path / name).write_bytes(b"%PDF")
+
+    store = VectorStore()
+    store.embeddings = FakeEmbeddings()
+    store.upsert_embeddings(
+        ["old"], [[1.0, 0.0, 0.0]], ["old chunk"], [{"source": "old.pdf"}]
+    )
+    return store, str(upload_path)
+
+
+def test_reindex_swaps_in_a_complete_collection(store, monkeypatch):
+    vector_store, upload_path = store
+    monkeypatch.setattr(indexing, "_chunk_file_task", _chunks)
+
+    report = Reindexer(vector_store, upload_path).run(progress=False)
+
+    ids = vector_store.collection.get(include=[])["ids"]
+    assert sorted(ids) == [
+        f"{source}:{i}" for source in ("a.pdf", "b.pdf") for i in range(3)
+    ]
+    assert report["chunks"] == 6
+
+
+def test_failed_reindex_keeps_the_current_index(store, monkeypatch):
+    vector_store, upload_path = store
+    monkeypatch.setattr(
+        indexing, "_chunk_file_task", lambda task: _chunks(task, missing=["b.pdf"])
+    )
+
+    with pytest.raises(RuntimeError):
+        Reindexer(vector_store, upload_path).run(cache_only=True, progress=False)
+
+    assert vector_store.collection.get(include=[])["ids"] == ["old"]
+    # The failed rebuild released its lock, so a new one can start
+    vector_store.abort_rebuild(vector_store.begin_rebuild())
+
+
+def test_ingest_restores_chunks_deleted_since_the_last_run(
+    store, test_settings, monkeypatch
+):
+    vector_store, upload_path = store
+    monkeypatch.setattr(indexing, "chunk_file", _file_chunks)
+    ingestor = BulkIngestor(
+        vector_store, upload_path, test_settings.ingest_state_path
+    )
+
+    assert ingestor.run([upload_path], progress=False)["ingested"] == 2
+    assert ingestor.run([upload_path], progress=False)["skipped"] == 2
+
+    vector_store.delete_document("a.pdf")
+    report = ingestor.run([upload_path], progress=False)
+
+    assert (report["ingested"], report["skipped"]) == (1, 1)
+    assert len(vector_store.get_records(where={"source": "a.pdf"})["ids"]) == 3
+
+
+def test_forced_ingest_keeps_summary_nodes(store, test_settings, monkeypatch):
+    vector_store, upload_path = store
+    monkeypatch.setattr(indexing, "chunk_file", _file_chunks)
+    vector_store.upsert_embeddings(
+        ["summary:a.pdf:0"],
+        [[1.0, 0.0, 0.0]],
+        ["summary"],
+        [{"source": "a.pdf", "node_type": "document_summary"}],
+    )
+
+    BulkIngestor(vector_store, upload_path, test_settings.ingest_state_path).run(
+        [upload_path], force=True, progress=False
+    )
+
+    ids = vector_store.get_records(where={"source": "a.pdf"})["ids"]
+    assert "summary:a.pdf:0" in ids
+    assert len(ids) == 4
+
+
+def test_ingest_keeps_files_with_the_same_name(
+    store, test_settings, monkeypatch, tmp_path
+):
+    vector_store, upload_path = store
+    monkeypatch.setattr(indexing, "chunk_file", _file_chunks)
+    for year in ("2022", "2023"):
+        (tmp_path / year).mkdir()
+        (tmp_path / year / "annual_report.pdf").write_bytes(f"%PDF {year}".encode())
+    archive_path = tmp_path / "filings.zip"
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        archive.writestr("2024/annual_report.pdf", b"%PDF 2024")
+        archive.writestr("copy/annual_report.pdf", b"%PDF 2022")
+
+    report = BulkIngestor(
+        vector_store, upload_path, test_settings.ingest_state_path
+    ).run(
+        [str(tmp_path / "2022"), str(tmp_path / "2023"), str(archive_path)],
+        progress=False,
+    )
+
+    assert report["ingested"] == 3
+    assert len(report["renamed"]) == 2
+    stored = sorted(name for name in os.listdir(upload_path) if "annual" in name)
+    assert len(stored) == 3
+    sources = {
+        metadata["source"]
+        for metadata in vector_store.get_records()["metadatas"]
+        if "annual" in metadata["source"]
+    }
+    assert sources == set(stored)
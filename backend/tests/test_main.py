@@ -0,0 +1,26 @@
+from fastapi.testclient import TestClient
+
+from main import app
+from services.container import services
+
+
+def test_ready_waits_for_warm_up(test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "warmup_on_startup", True)
+    monkeypatch.setattr(services, "_services", {})
+
+    response = TestClient(app).get("/ready")
+
+    assert response.status_code == 503
+    assert response.json()["ready"] is False
+
+
+def test_ready_without_warm_up(test_settings, monkeypatch):
+    # Chat never builds the PDF processor, so lazily built services are not
+    # all present even while the app is serving
+    monkeypatch.setattr(test_settings, "warmup_on_startup", False)
+    monkeypatch.setattr(services, "_services", {})
+
+    response = TestClient(app).get("/ready")
+
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db import Conversation, Message
+from db.models import Base
+from services.message_writer import MessageWriter
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+def test_failing_write_goes_to_dead_letter(session_factory, tmp_path):
+    dead_letter_path = tmp_path / "dead_letter.jsonl"
+    writer = MessageWriter(
+        session_factory,
+        flush_interval=0.05,
+        max_retries=1,
+        dead_letter_path=str(dead_letter_path),
+    )
+
+    writer.add_conversation("a", "First")
+    writer.add_message("a", "user", "question")
+    writer.add_message("a", "assistant", None)  # violates NOT NULL
+    writer.add_conversation("b", "Second")
+    writer.add_message("b", "user", "other question")
+    writer.close()
+
+    session = session_factory()
+    try:
+        assert {c.token for c in session.query(Conversation)} == {"a", "b"}
+        contents = sorted(m.content for m in session.query(Message))
+        assert contents == ["other question", "question"]
+    finally:
+        session.close()
+
+    lines = dead_letter_path.read_text().splitlines()
+    dead_letters = [json.loads(line) for line in lines]
+    assert len(dead_letters) == 1
+    assert dead_letters[0]["kind"] == "message"
+    assert dead_letters[0]["role"] == "assistant"
@@ -0,0 +1,49 @@
+import numpy as np
+
+from services.mmr import adaptive_k, mmr_select, trim_to_relevant
+
+
+def test_adaptive_k_cuts_at_largest_gap():
+    relevance = np.array([0.95, 0.94, 0.94, 0.60, 0.59])
+    assert adaptive_k(relevance, min_k=2, max_k=5, min_gap=0.05) == 3
+
+
+def test_adaptive_k_keeps_max_k_on_plateau():
+    relevance = np.linspace(0.9, 0.8, 10)
+    assert adaptive_k(relevance, min_k=2, max_k=8, min_gap=0.05) == 8
+
+
+def test_trim_cuts_picks_at_the_gap_in_selection_order():
+    relevance = np.array([0.95, 0.94, 0.93, 0.60, 0.59])
+    kept = trim_to_relevant([0, 2, 3, 4], relevance, min_k=2, max_k=5, min_gap=0.05)
+    assert kept == [0, 2]
+
+
+def test_trim_keeps_diverse_picks_over_duplicated_top_k():
+    rng = np.random.default_rng(0)
+    dim = 16
+    boilerplate = np.zeros(dim)
+    boilerplate[0] = 1.0
+    query = boilerplate + 0.3 * rng.standard_normal(dim)
+    # Ten copies of the same boilerplate are the most relevant candidates
+    candidates = [boilerplate] * 10
+    clusters = [0] * 10
+    for cluster in range(1, 21):
+        vector = 0.7 * query / np.linalg.norm(query) + 0.5 * rng.standard_normal(dim)
+        candidates.append(vector)
+        clusters.append(cluster)
+
+    selected, relevance = mmr_select(query, candidates, k=8, lambda_mult=0.5)
+    assert set(np.argsort(-relevance)[:8]) <= set(range(10))
+
+    kept = trim_to_relevant(selected, relevance, min_k=2, max_k=8, min_gap=0.05)
+    assert len({clusters[index] for index in kept}) > 1
+    assert len([index for index in kept if clusters[index] == 0]) == 1
+
+
+def test_mmr_select_skips_near_duplicates():
+    query = [1.0, 0.0, 0.0]
+    candidates = [[1.0, 0.1, 0.0], [1.0, 0.11, 0.0], [0.8, 0.0, 0.6]]
+    selected, relevance = mmr_select(query, candidates, k=2, lambda_mult=0.5)
+    assert selected == [0, 2]
+    assert relevance.shape == (3,)
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import time
+
+from services import profiling
+from services.profiling import Profile, ProfileStore
+
+
+def _spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def _other_request(seconds):
+    # Not profiled; shares the event loop with the profiled request
+    await asyncio.sleep(0)
+    _spin(seconds)
+
+
+async def _profiled_request(profile):
+    profiling._current.set(profile)
+    with profiling.stage("waiting"):
+        await asyncio.sleep(0.2)
+    with profiling.stage("working"):
+        _spin(0.1)
+
+
+def test_awaiting_stage_does_not_sample_other_coroutines(test_settings, monkeypatch):
+    profile = Profile("/test", interval=0.002)
+    monkeypatch.setattr(profiling, "_active", profile)
+
+    async def run():
+        await asyncio.gather(_profiled_request(profile), _other_request(0.15))
+
+    profile.start()
+    asyncio.run(run())
+    profile.stop()
+
+    stacks = profile.samples
+    assert not [stack for stack in stacks if "_other_request" in stack]
+    assert sum(
+        count for stack, count in stacks.items() if stack.startswith("working;")
+    ) > 0
+    assert [stage["name"] for stage in profile.stages] == ["waiting", "working"]
+
+
+def test_worker_threads_are_sampled_under_the_callers_stage(
+    test_settings, monkeypatch
+):
+    profile = Profile("/test", interval=0.002)
+    monkeypatch.setattr(profiling, "_active", profile)
+
+    async def run():
+        profiling._current.set(profile)
+        with profiling.stage("retrieval"):
+            await profiling.to_thread(_spin, 0.1)
+
+    profile.start()
+    asyncio.run(run())
+    profile.stop()
+
+    assert any(
+        stack.startswith("retrieval;") and "_spin" in stack
+        for stack in profile.samples
+    )
+
+
+def test_store_keeps_the_most_recent_profiles(test_settings, tmp_path):
+    store = ProfileStore(str(tmp_path / "profiles"), max_entries=3)
+    # Created within the same second; the random suffixes must not decide
+    profiles = [Profile(f"/test/{i}") for i in range(6)]
+    for profile in profiles:
+        store.save(profile)
+
+    kept = [summary["id"] for summary in store.list_profiles()]
+    assert kept == [profile.id for profile in reversed(profiles[3:])]
+    assert len(os.listdir(store.profile_dir)) == 6
+    assert store.flamegraph_path(profiles[-1].id).endswith(".folded")
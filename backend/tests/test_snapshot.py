@@ -0,0 +1,119 @@
+import pytest
+
+from services import snapshot as snapshot_module
+from services import vector_store as vector_store_module
+from services.snapshot import Snapshot, SnapshotManager
+from services.vector_store import VectorStore
+
+
+@pytest.fixture
+def store(test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "vector_db_batch_size", 2)
+    monkeypatch.setattr(vector_store_module, "OLD_COLLECTION_GRACE_SECONDS", 0)
+    store = VectorStore()
+    store.upsert_embeddings(
+        [f"id{i}" for i in range(5)],
+        [[float(i), 1.0, 0.0, 0.5] for i in range(5)],
+        [f"chunk {i}" for i in range(5)],
+        [{"source": "a.pdf", "page": i} for i in range(5)],
+    )
+    return store
+
+
+def test_export_writes_embeddings_in_batches(store, test_settings, monkeypatch):
+    manager = SnapshotManager(store, test_settings.snapshot_path)
+    batches = []
+    get_records = store.get_records
+
+    def recording_get_records(include_embeddings=False, where=None, ids=None):
+        if include_embeddings:
+            batches.append(ids)
+        return get_records(include_embeddings, where, ids)
+
+    monkeypatch.setattr(store, "get_records", recording_get_records)
+    info = manager.export()
+
+    assert [len(ids) for ids in batches] == [2, 2, 1]
+    with Snapshot(manager.get_path(info["snapshot_id"])) as snapshot:
+        ids = snapshot.records["ids"]
+        rows = snapshot.embedding_rows(0, len(ids))
+    assert [row[0] for row in rows] == [float(id_[2:]) for id_ in ids]
+
+
+def test_delta_export_and_import_round_trip(store, test_settings):
+    manager = SnapshotManager(store, test_settings.snapshot_path)
+    full = manager.export()
+    store.delete_ids(["id0"])
+    store.upsert_embeddings(
+        ["id9"], [[9.0, 1.0, 0.0, 0.5]], ["chunk 9"], [{"source": "b.pdf"}]
+    )
+    delta = manager.export(incremental=True)
+    assert (delta["kind"], delta["count"], delta["deleted_count"]) == ("delta", 1, 1)
+
+    manager.import_snapshot(full["snapshot_id"])
+    assert len(store.collection.get(include=[])["ids"]) == 5
+    manager.import_snapshot(delta["snapshot_id"])
+
+    results = store.get_records(include_embeddings=True)
+    rows = dict(zip(results["ids"], results["embeddings"]))
+    assert sorted(rows) == ["id1", "id2", "id3", "id4", "id9"]
+    assert rows["id9"][0] == 9.0
+
+
+def test_export_skips_chunks_deleted_meanwhile(store, test_settings, monkeypatch):
+    manager = SnapshotManager(store, test_settings.snapshot_path)
+    get_records = store.get_records
+
+    def get_records_then_delete(include_embeddings=False, where=None, ids=None):
+        results = get_records(include_embeddings, where, ids)
+        if include_embeddings:
+            # Another worker deletes a whole batch that is still to be read
+            store.delete_ids(["id2", "id3"])
+        return results
+
+    monkeypatch.setattr(store, "get_records", get_records_then_delete)
+    info = manager.export()
+
+    assert info["count"] == 3
+    with Snapshot(manager.get_path(info["snapshot_id"])) as snapshot:
+        assert snapshot.records["ids"] == ["id0", "id1", "id4"]
+        assert sorted(snapshot.records["fingerprints"]) == ["id0", "id1", "id4"]
+        assert [row[0] for row in snapshot.embedding_rows(0, 3)] == [0.0, 1.0, 4.0]
+
+
+def test_delta_after_model_change_holds_every_chunk(store, test_settings, monkeypatch):
+    manager = SnapshotManager(store, test_settings.snapshot_path)
+    manager.export()
+    monkeypatch.setattr(test_settings, "embedding_model", "another-model")
+
+    delta = manager.export(incremental=True)
+
+    assert (delta["kind"], delta["count"]) == ("delta", 5)
+
+
+def test_failed_full_import_keeps_the_current_index(
+    store, test_settings, monkeypatch
+):
+    manager = SnapshotManager(store, test_settings.snapshot_path)
+    full = manager.export()
+    store.upsert_embeddings(
+        ["id9"], [[9.0, 1.0, 0.0, 0.5]], ["chunk 9"], [{"source": "b.pdf"}]
+    )
+    embedding_rows = snapshot_module.Snapshot.embedding_rows
+    calls = []
+
+    def failing_embedding_rows(self, start, end):
+        calls.append(start)
+        if len(calls) > 1:
+            raise OSError("disk error")
+        return embedding_rows(self, start, end)
+
+    monkeypatch.setattr(
+        snapshot_module.Snapshot, "embedding_rows", failing_embedding_rows
+    )
+    with pytest.raises(OSError):
+        manager.import_snapshot(full["snapshot_id"])
+
+    assert len(store.collection.get(include=[])["ids"]) == 6
+    # The failed import released the rebuild, so a new one can start
+    store.abort_rebuild(store.begin_rebuild())
@@ -0,0 +1,220 @@
+import asyncio
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from services import vector_store as vector_store_module
+from services.vector_client import VectorStoreClient
+from services.vector_protocol import (
+    HEADER,
+    PING,
+    SEARCH,
+    STATUS_OK,
+    decode_body,
+    decode_vectors,
+    encode_body,
+    encode_frame,
+    encode_vectors,
+)
+from services.vector_server import VectorIndexServer
+from services.vector_store import VectorStore
+
+
+class FakeStore:
+    def __init__(self):
+        self.search_batches = []
+        self.fail = False
+
+    def similarity_search_batch(self, queries, k, filter=None):
+        self.search_batches.append(list(queries))
+        return [
+            [(Document(page_content=query, metadata={"k": k}), 0.1)]
+            for query in queries
+        ]
+
+    def get_document_info(self):
+        if self.fail:
+            raise ValueError("index unavailable")
+        return [{"filename": "a.pdf"}]
+
+
+class ServerThread:
+    """Vector index server running on its own event loop thread"""
+
+    def __init__(self, vector_store, socket_path):
+        self.socket_path = socket_path
+        self.server = VectorIndexServer(vector_store, socket_path)
+        self.loop = asyncio.new_event_loop()
+        self.task = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.task = self.loop.create_task(self.server.serve_forever())
+        try:
+            self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.loop.close()
+
+    def start(self):
+        self.thread.start()
+        deadline = time.monotonic() + 5
+        while not os.path.exists(self.socket_path):
+            assert time.monotonic() < deadline, "server did not start"
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.task.cancel)
+        self.thread.join(5)
+
+
+@pytest.fixture
+def socket_path(test_settings):
+    # Unix socket paths are limited to ~100 characters, too short for tmp_path
+    with tempfile.TemporaryDirectory(dir="/tmp") as directory:
+        yield os.path.join(directory, "vectors.sock")
+
+
+@pytest.fixture
+def fake_server(socket_path):
+    store = FakeStore()
+    server = ServerThread(store, socket_path).start()
+    yield store, server
+    server.stop()
+
+
+def _send(sock, opcode, request_id, payload, vectors=None):
+    sock.sendall(encode_frame(opcode, request_id, encode_body(payload, vectors)))
+
+
+def _receive(sock):
+    length, status, request_id = HEADER.unpack(
+        VectorStoreClient._recv_exactly(sock, HEADER.size)
+    )
+    body = VectorStoreClient._recv_exactly(sock, length)
+    return status, request_id, decode_body(body)
+
+
+def test_vectors_round_trip_as_float32():
+    vectors = [[0.5, -1.25, 3.0], [1.0, 0.0, 2.5]]
+    blob, rows, dim = encode_vectors(vectors)
+    assert (rows, dim, len(blob)) == (2, 3, 24)
+    assert decode_vectors(blob, rows, dim) == vectors
+
+    array = np.array(vectors, dtype=np.float64)
+    assert encode_vectors(array) == (blob, 2, 3)
+    assert encode_vectors([]) == (b"", 0, 0)
+
+    payload, decoded = decode_body(encode_body({"k": 4}, vectors))
+    assert payload == {"k": 4}
+    assert decoded == vectors
+    assert decode_body(encode_body({"k": 4})) == ({"k": 4}, None)
+
+
+def test_searches_are_batched_and_answered_out_of_order(
+    fake_server, socket_path, test_settings, monkeypatch
+):
+    store, _ = fake_server
+    monkeypatch.setattr(test_settings, "vector_server_batch_window_ms", 100)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(5)
+        sock.connect(socket_path)
+        # Pipelined on one connection: the searches wait for the batch window,
+        # the ping is answered first
+        _send(sock, SEARCH, 1, {"query": "revenue", "k": 2, "filter": None})
+        _send(sock, SEARCH, 2, {"query": "margin", "k": 2, "filter": None})
+        _send(sock, PING, 3, {})
+
+        responses = [_receive(sock) for _ in range(3)]
+
+    assert responses[0][1] == 3
+    assert all(status == STATUS_OK for status, _, _ in responses)
+    results = {
+        request_id: payload["results"][0][0]
+        for _, request_id, (payload, _) in responses[1:]
+    }
+    assert results == {1: "revenue", 2: "margin"}
+    assert store.search_batches == [["revenue", "margin"]]
+
+
+def test_server_errors_are_raised_and_the_connection_reused(fake_server, socket_path):
+    store, _ = fake_server
+    client = VectorStoreClient(socket_path, timeout=5)
+    store.fail = True
+
+    with pytest.raises(RuntimeError, match="index unavailable"):
+        client.get_document_info()
+
+    store.fail = False
+    assert client.get_document_info() == [{"filename": "a.pdf"}]
+
+
+def test_client_reconnects_after_the_server_restarts(socket_path):
+    client = VectorStoreClient(socket_path, timeout=5)
+    server = ServerThread(FakeStore(), socket_path).start()
+    assert client.ping()
+    server.stop()
+
+    server = ServerThread(FakeStore(), socket_path).start()
+    try:
+        # The cached connection was closed by the old server
+        assert client.ping()
+    finally:
+        server.stop()
+
+
+def test_call_times_out_when_the_server_hangs(socket_path):
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen()
+    try:
+        client = VectorStoreClient(socket_path, timeout=0.2)
+        with pytest.raises(socket.timeout):
+            client.ping()
+        # The connection of the timed out call is dropped
+        assert client._local.sock is None
+    finally:
+        listener.close()
+
+
+def test_rebuild_over_the_socket(test_settings, socket_path, monkeypatch):
+    monkeypatch.setattr(vector_store_module, "OLD_COLLECTION_GRACE_SECONDS", 0)
+    store = VectorStore()
+    store.upsert_embeddings(
+        ["old"], [[1.0, 0.0, 0.0]], ["old chunk"], [{"source": "old.pdf"}]
+    )
+    server = ServerThread(store, socket_path).start()
+    client = VectorStoreClient(socket_path, timeout=5)
+    try:
+        with pytest.raises(RuntimeError):
+            with client.rebuild() as name:
+                client.upsert_rebuild(
+                    name, ["lost"], [[0.0, 1.0, 0.0]], ["lost"], [{"source": "x"}]
+                )
+                raise RuntimeError("embedding failed")
+        assert client.get_records()["ids"] == ["old"]
+
+        with client.rebuild() as name:
+            client.upsert_rebuild(
+                name,
+                ["a", "b"],
+                [[0.0, 1.0, 0.0], [0.0, 0.0, 1.0]],
+                ["chunk a", "chunk b"],
+                [{"source": "a.pdf"}, {"source": "b.pdf"}],
+            )
+        records = client.get_records(include_embeddings=True)
+        assert sorted(records["ids"]) == ["a", "b"]
+        rows = dict(zip(records["ids"], records["embeddings"]))
+        assert rows["b"] == [0.0, 0.0, 1.0]
+    finally:
+        server.stop()
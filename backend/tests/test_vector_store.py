@@ -0,0 +1,77 @@
+import pytest
+
+from services import vector_store as vector_store_module
+from services.vector_store import VectorStore
+
+DIM = 4
+
+
+def _vector(index):
+    return [float(index), 1.0, 0.0, 0.0]
+
+
+@pytest.fixture
+def store(test_settings, monkeypatch):
+    monkeypatch.setattr(vector_store_module, "OLD_COLLECTION_GRACE_SECONDS", 0)
+    return VectorStore()
+
+
+def _add(store, count):
+    ids = [f"id{i}" for i in range(count)]
+    store.upsert_embeddings(
+        ids,
+        [_vector(i) for i in range(count)],
+        [f"text {i}" for i in range(count)],
+        [{"source": "report.pdf", "node_type": "chunk"} for _ in range(count)],
+    )
+    return ids
+
+
+class _DeleteDuringCopy:
+    """Collection proxy deleting records after the first page is read"""
+
+    def __init__(self, collection, store, ids):
+        self._collection = collection
+        self._store = store
+        self._ids = ids
+        self._deleted = False
+
+    def get(self, *args, **kwargs):
+        records = self._collection.get(*args, **kwargs)
+        if not self._deleted:
+            self._deleted = True
+            self._store.delete_ids(self._ids)
+        return records
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+def test_compact_keeps_records_deleted_around(store, test_settings, monkeypatch):
+    monkeypatch.setattr(test_settings, "vector_db_batch_size", 2)
+    ids = _add(store, 7)
+
+    copy_records = store._copy_records
+    calls = []
+
+    def copy_with_delete(source, target, ids):
+        if not calls:
+            source = _DeleteDuringCopy(source, store, ["id0"])
+        calls.append(ids)
+        copy_records(source, target, ids)
+
+    monkeypatch.setattr(store, "_copy_records", copy_with_delete)
+
+    assert store.compact()
+    remaining = store.collection.get(include=[])["ids"]
+    assert sorted(remaining) == sorted(ids[1:])
+
+
+def test_compact_copies_records_and_resets_deletions(store):
+    ids = _add(store, 5)
+    store.delete_ids(ids[:2])
+
+    assert store.compact()
+    records = store.collection.get(include=["embeddings", "documents"])
+    assert sorted(records["ids"]) == ids[2:]
+    assert store._state["deleted_since_compaction"] == 0
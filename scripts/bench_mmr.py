@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""Benchmark vectorized MMR selection and adaptive k on synthetic candidates.
+
+Builds clusters of near-duplicate embeddings (like boilerplate repeated on
+every page of a report), then compares the vectorized selection in
+``services.mmr`` with a per-step reference implementation that recomputes
+similarities against the selected set on every iteration, as well as plain
+top-k by relevance.
+
+Usage:
+    python scripts/bench_mmr.py [--candidates 1000] [--dim 1536] [--k 8] [--repeat 20]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+sys.path.insert(0, BACKEND_DIR)
+
+from services.mmr import mmr_select, normalize_rows, trim_to_relevant  # noqa: E402
+
+
+def make_candidates(count: int, dim: int, clusters: int, rng):
+    """Query plus candidates drawn around a few cluster centres"""
+    centres = normalize_rows(rng.standard_normal((clusters, dim)))
+    query = normalize_rows(centres.mean(axis=0))[0]
+
+    # Noise of norm ~0.3 keeps members of a cluster at ~0.95 cosine similarity
+    labels = rng.integers(0, clusters, size=count)
+    noise = (0.3 / np.sqrt(dim)) * rng.standard_normal((count, dim))
+    candidates = normalize_rows(centres[labels] + noise)
+    return query, candidates, labels
+
+
+def reference_mmr(query, candidates, k: int, lambda_mult: float):
+    """MMR that recomputes candidate/selected similarities on every step"""
+    candidates = normalize_rows(candidates)
+    relevance = candidates @ normalize_rows(query)[0]
+
+    selected = [int(np.argmax(relevance))]
+    while len(selected) < k:
+        best_index, best_score = -1, -np.inf
+        selected_vectors = candidates[selected]
+        for index in range(len(candidates)):
+            if index in selected:
+                continue
+            redundancy = float(np.max(selected_vectors @ candidates[index]))
+            score = lambda_mult * relevance[index] - (1 - lambda_mult) * redundancy
+            if score > best_score:
+                best_index, best_score = index, score
+        selected.append(best_index)
+    return selected
+
+
+def timed(func, repeat: int):
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - start_time)
+    return statistics.median(durations) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=12)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--min-k", type=int, default=2)
+    parser.add_argument("--min-gap", type=float, default=0.05)
+    parser.add_argument("--lambda-mult", type=float, default=0.5)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    query, candidates, labels = make_candidates(
+        args.candidates, args.dim, args.clusters, rng
+    )
+
+    vectorized_ms, (selected, relevance) = timed(
+        lambda: mmr_select(query, candidates, args.k, args.lambda_mult), args.repeat
+    )
+    adaptive_ms, kept = timed(
+        lambda: trim_to_relevant(
+            selected, relevance, args.min_k, args.k, args.min_gap
+        ),
+        args.repeat,
+    )
+    reference_ms, reference = timed(
+        lambda: reference_mmr(query, candidates, args.k, args.lambda_mult),
+        max(1, args.repeat // 10),
+    )
+    top_k = list(np.argsort(-relevance)[: args.k])
+
+    if reference != selected:
+        raise SystemExit("FAIL: vectorized MMR differs from the reference selection")
+
+    print(
+        f"{args.candidates} candidates x {args.dim} dims, k={args.k}, "
+        f"lambda={args.lambda_mult}"
+    )
+    print(f"{'vectorized MMR':>16}: {vectorized_ms:8.2f} ms")
+    print(f"{'reference MMR':>16}: {reference_ms:8.2f} ms")
+    print(f"{'speedup':>16}: {reference_ms / vectorized_ms:8.1f}x")
+    print(f"{'adaptive k':>16}: {adaptive_ms:8.3f} ms -> k={len(kept)}")
+    print(
+        f"{'distinct clusters':>16}: top-k {len(set(labels[top_k]))} of {args.k}, "
+        f"MMR {len(set(labels[kept]))} of {len(kept)}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""Measure backend cold-start import cost against a time budget.
+
+Runs ``python -X importtime -c "import main"`` from the backend directory in a
+fresh interpreter, then reports the wall time and the most expensive imports.
+
+Usage:
+    python scripts/bench_startup.py [--budget-ms 1500] [--repeat 3] [--top 15]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def run_once(module: str):
+    start_time = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    wall_time = time.perf_counter() - start_time
+
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"Importing {module} failed")
+
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append((name, int(self_us), int(cumulative_us), len(indent)))
+
+    return wall_time, imports
+
+
+def direct_imports(imports, module: str):
+    """Imports made directly by ``module``.
+
+    importtime lists a module after everything it imported, each nesting
+    level indented further, so the module's children are the entries one
+    level deeper that precede it, back to the previous entry at its level.
+    """
+    position = max(
+        (index for index, entry in enumerate(imports) if entry[0] == module),
+        default=None,
+    )
+    if position is None:
+        return []
+
+    indent = imports[position][3]
+    children = []
+    for entry in reversed(imports[:position]):
+        if entry[3] <= indent:
+            break
+        if entry[3] == indent + 2:
+            children.append(entry)
+    return children
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    wall_times = []
+    imports = []
+    for _ in range(args.repeat):
+        wall_time, imports = run_once(args.module)
+        wall_times.append(wall_time)
+
+    median_ms = statistics.median(wall_times) * 1000
+
+    children = direct_imports(imports, args.module)
+    children.sort(key=lambda entry: entry[2], reverse=True)
+
+    print(f"import {args.module}: median {median_ms:.1f} ms over {args.repeat} runs")
+    print(f"{'cumulative ms':>14}  {'self ms':>8}  module")
+    for name, self_us, cumulative_us, _ in children[: args.top]:
+        print(f"{cumulative_us / 1000:14.1f}  {self_us / 1000:8.1f}  {name}")
+
+    if median_ms > args.budget_ms:
+        print(f"FAIL: startup {median_ms:.1f} ms exceeds budget {args.budget_ms:.1f} ms")
+        raise SystemExit(1)
+
+    print(f"OK: startup within budget {args.budget_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()